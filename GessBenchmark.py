@@ -0,0 +1,199 @@
+# Description: Offline benchmarks of the Gess rules engine, with a saved baseline to catch performance regressions
+
+import argparse
+import json
+import platform
+import random
+import time
+import tracemalloc
+
+from GessGame import GessGame, INTERIOR_MASK
+from GessSelfPlay import play_game
+
+SEED = 20200525                     # every fixture is generated from this seed, so runs are comparable
+REPLAY_GAMES = 8                    # recorded games replayed by the replay benchmark
+MIN_TIME = 0.5                      # seconds each timing round runs for at least
+ROUNDS = 3                          # timing rounds per benchmark, the best is reported
+TOLERANCE = 0.10                    # slowdown against the baseline that counts as a regression
+
+
+def recorded_games(count=REPLAY_GAMES, seed=SEED):
+    """Returns count reproducible self-play games as lists of ('c3', 'c4') moves"""
+    return [[tuple(move.split('-')) for move in play_game((number, 'random', seed + number, 500))['moves']]
+            for number in range(count)]
+
+
+def positions_after(moves):
+    """Returns a list of games at every position reached by the ('c3', 'c4') moves, starting position included"""
+    game = GessGame()
+    positions = [GessGame.from_bytes(game.to_bytes())]
+    for center_from, center_to in moves:
+        game.make_move(center_from, center_to, verbose=False)
+        positions.append(GessGame.from_bytes(game.to_bytes()))
+    return positions
+
+
+def make_fixtures(seed=SEED):
+    """
+    Returns the inputs of the benchmarks: recorded games, crowded positions (the first moves of each game), sparse
+    positions (the last moves), and moves to validate at those positions, legal and illegal alike.
+    """
+    generator = random.Random(seed)
+    games = recorded_games(seed=seed)
+    crowded = []
+    sparse = []
+    for moves in games:
+        positions = [game for game in positions_after(moves) if game.get_game_state() == 'UNFINISHED']
+        crowded.extend(positions[:6])
+        sparse.extend(positions[-6:])
+    checks = []
+    for game in crowded + sparse:
+        legal = list(game.legal_moves())
+        checks.extend((game, move) for move in generator.sample(legal, min(4, len(legal))))
+        for _ in range(4):                                      # random centers, mostly illegal moves
+            center_from = (generator.randrange(20), generator.randrange(20))
+            center_to = (generator.randrange(20), generator.randrange(20))
+            checks.append((game, (center_from, center_to)))
+    return {'games': games, 'crowded': crowded, 'sparse': sparse, 'checks': checks,
+            'crowded_boards': [(game, [game.get_stones('BLACK'), game.get_stones('WHITE')]) for game in crowded],
+            'sparse_boards': [(game, [game.get_stones('BLACK'), game.get_stones('WHITE')]) for game in sparse]}
+
+
+def validate_moves(fixtures):
+    """Benchmark: validate_move on legal and illegal moves, crowded and sparse. Returns the number of operations."""
+    for game, (center_from, center_to) in fixtures['checks']:
+        game.validate_move(center_from, center_to)
+    return len(fixtures['checks'])
+
+
+def replay_games(fixtures):
+    """Benchmark: replays the recorded games through make_move, one operation per move"""
+    count = 0
+    for moves in fixtures['games']:
+        game = GessGame()
+        for center_from, center_to in moves:
+            game.make_move(center_from, center_to, verbose=False)
+        count += len(moves)
+    return count
+
+
+def scan_rings(boards):
+    """Rescans every center of every (game, board) for rings, one operation per board"""
+    for game, board in boards:
+        game.check_for_rings(board, [0, 0], INTERIOR_MASK)
+    return len(boards)
+
+
+def scan_rings_crowded(fixtures):
+    """Benchmark: full ring scans on crowded opening positions"""
+    return scan_rings(fixtures['crowded_boards'])
+
+
+def scan_rings_sparse(fixtures):
+    """Benchmark: full ring scans on sparse late-game positions"""
+    return scan_rings(fixtures['sparse_boards'])
+
+
+def enumerate_moves(fixtures):
+    """Benchmark: lists every legal move, one operation per position"""
+    positions = fixtures['crowded'] + fixtures['sparse']
+    for game in positions:
+        for move in game.legal_moves():
+            pass
+    return len(positions)
+
+
+BENCHMARKS = {
+    'validate_move': validate_moves,
+    'replay_games': replay_games,
+    'ring_scan_crowded': scan_rings_crowded,
+    'ring_scan_sparse': scan_rings_sparse,
+    'legal_moves': enumerate_moves,
+}
+
+
+def measure(benchmark, fixtures, min_time=MIN_TIME, rounds=ROUNDS):
+    """
+    Runs a benchmark and returns {'ops_per_sec', 'alloc_bytes_per_op', 'alloc_blocks_per_op'}: the best throughput
+    over rounds of at least min_time seconds, then the memory allocated (peak traced bytes) and blocks left allocated
+    by one more run under tracemalloc.
+    """
+    best = 0.0
+    for _ in range(rounds):
+        operations = 0
+        start = time.perf_counter()
+        while True:
+            operations += benchmark(fixtures)
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, operations / elapsed)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    operations = benchmark(fixtures)
+    peak = tracemalloc.get_traced_memory()[1]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(statistic.count_diff for statistic in after.compare_to(before, 'filename'))
+    return {'ops_per_sec': best, 'alloc_bytes_per_op': peak / operations, 'alloc_blocks_per_op': blocks / operations}
+
+
+def run(names=None, min_time=MIN_TIME, rounds=ROUNDS):
+    """Runs the benchmarks called names (every benchmark by default), printing and returning their results"""
+    fixtures = make_fixtures()
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = measure(BENCHMARKS[name], fixtures, min_time, rounds)
+        print("%-18s %12.0f ops/s %10.1f bytes/op %8.2f blocks/op"
+              % (name, results[name]['ops_per_sec'], results[name]['alloc_bytes_per_op'],
+                 results[name]['alloc_blocks_per_op']))
+    return results
+
+
+def save_baseline(results, path):
+    """Writes results to a baseline file, along with the interpreter and machine they were measured on"""
+    with open(path, 'w') as baseline_file:
+        json.dump({'python': platform.python_version(), 'machine': platform.platform(), 'results': results},
+                  baseline_file, indent=2, sort_keys=True)
+
+
+def compare(results, path, tolerance=TOLERANCE):
+    """
+    Compares results with the baseline file at path, printing the change in each benchmark's throughput.
+    Returns the names of the benchmarks more than tolerance slower than the baseline.
+    """
+    with open(path) as baseline_file:
+        baseline = json.load(baseline_file)['results']
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            print("%-18s not in baseline" % name)
+            continue
+        ratio = result['ops_per_sec'] / baseline[name]['ops_per_sec']
+        print("%-18s %+7.1f%% ops/s %+10.1f bytes/op" % (name, (ratio - 1) * 100, result['alloc_bytes_per_op'] -
+                                                        baseline[name]['alloc_bytes_per_op']))
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the Gess rules engine")
+    parser.add_argument('names', nargs='*', help="benchmarks to run (default all): " + ", ".join(BENCHMARKS))
+    parser.add_argument('--min-time', type=float, default=MIN_TIME, help="seconds per timing round")
+    parser.add_argument('--rounds', type=int, default=ROUNDS, help="timing rounds per benchmark")
+    parser.add_argument('--save', help="write the results to this baseline file")
+    parser.add_argument('--baseline', help="compare the results with this baseline file")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="allowed slowdown, e.g. 0.1 for 10%%")
+    arguments = parser.parse_args()
+    unknown = set(arguments.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmarks: " + ", ".join(sorted(unknown)))
+    measured = run(arguments.names, arguments.min_time, arguments.rounds)
+    if arguments.save:
+        save_baseline(measured, arguments.save)
+    if arguments.baseline:
+        slower = compare(measured, arguments.baseline, arguments.tolerance)
+        if slower:
+            raise SystemExit("slower than baseline: " + ", ".join(slower))
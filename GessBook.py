@@ -0,0 +1,120 @@
+# Description: Opening book of Gess positions and moves, built from recorded games
+
+import argparse
+import struct
+
+from GessGame import GessGame, MoveReason
+from GessRecords import GameRecordStore
+from GessTransposition import encode_move, decode_move
+
+BOOK_MAGIC = b'GESSBK01'
+BOOK_HEADER = struct.Struct('<8sI')         # magic, number of entries
+BOOK_ENTRY = struct.Struct('<QIII')         # position hash, encode_move code, games the move was played in, games won
+MAX_PLIES = 16                              # moves of each game added to the book
+MIN_VISITS = 2                              # moves played fewer times than this are left out of the book
+
+
+class OpeningBook:
+    """
+    Represents the moves played from early positions in recorded games, keyed by position hash.
+    For each move it keeps the number of games it was played in and how many of those the player making it won.
+    Lookups are one dict access, so the book can be checked before every search at no real cost.
+    """
+
+    def __init__(self, entries=None):
+        """Initializes a book from a dict of position hash -> {move: [visits, wins]} (empty by default)"""
+        if entries is None:
+            entries = {}
+        self._entries = entries
+
+    def __len__(self):
+        """Returns the number of positions in the book"""
+        return len(self._entries)
+
+    def add_game(self, moves, game_state, max_plies=MAX_PLIES):
+        """Adds the first max_plies moves of a game (pairs of (column, row) centers) and its final game state"""
+        game = GessGame()
+        for move in moves[:max_plies]:
+            position_hash = game.get_position_hash()
+            player = game.get_current_player()
+            if game.validate_move(move[0], move[1]) != MoveReason.VALID:
+                break
+            counts = self._entries.setdefault(position_hash, {}).setdefault(move, [0, 0])
+            counts[0] += 1
+            if game_state == player + '_WON':
+                counts[1] += 1
+            game.push_move(move[0], move[1])
+
+    def prune(self, min_visits=MIN_VISITS):
+        """Drops the moves played fewer than min_visits times, and the positions left without moves"""
+        for position_hash in list(self._entries):
+            moves = {move: counts for move, counts in self._entries[position_hash].items() if counts[0] >= min_visits}
+            if moves:
+                self._entries[position_hash] = moves
+            else:
+                del self._entries[position_hash]
+
+    def lookup(self, position_hash):
+        """Returns [(move, visits, win rate)] for the position, most played first (empty if it is not in the book)"""
+        moves = self._entries.get(position_hash)
+        if not moves:
+            return []
+        return sorted(((move, visits, wins / visits) for move, (visits, wins) in moves.items()),
+                      key=lambda entry: entry[1], reverse=True)
+
+    def best_move(self, game):
+        """Returns the book move with the best win rate for game's position, or None if the book has no legal move"""
+        best = None
+        for move, visits, win_rate in self.lookup(game.get_position_hash()):
+            if game.validate_move(move[0], move[1]) != MoveReason.VALID:    # guards against hash collisions
+                continue
+            if best is None or (win_rate, visits) > best[0]:
+                best = ((win_rate, visits), move)
+        if best is None:
+            return None
+        return best[1]
+
+    def save(self, path):
+        """Writes the book to path as fixed-size entries"""
+        count = sum(len(moves) for moves in self._entries.values())
+        with open(path, 'wb') as book_file:
+            book_file.write(BOOK_HEADER.pack(BOOK_MAGIC, count))
+            for position_hash, moves in self._entries.items():
+                for move, (visits, wins) in moves.items():
+                    book_file.write(BOOK_ENTRY.pack(position_hash, encode_move(move), visits, wins))
+
+    @classmethod
+    def load(cls, path):
+        """Reads a book written by save"""
+        with open(path, 'rb') as book_file:
+            data = book_file.read()
+        magic, count = BOOK_HEADER.unpack_from(data, 0)
+        if magic != BOOK_MAGIC or len(data) != BOOK_HEADER.size + count * BOOK_ENTRY.size:
+            raise ValueError("%s is not a Gess opening book" % path)
+        entries = {}
+        for position_hash, move_code, visits, wins in BOOK_ENTRY.iter_unpack(data[BOOK_HEADER.size:]):
+            entries.setdefault(position_hash, {})[decode_move(move_code)] = [visits, wins]
+        return cls(entries)
+
+    @classmethod
+    def from_records(cls, store, max_plies=MAX_PLIES, min_visits=MIN_VISITS):
+        """Builds a book from every game in a GessRecords.GameRecordStore"""
+        book = cls()
+        for offset in store.game_offsets():
+            moves, game_state = store.read_game(offset)
+            book.add_game(moves, game_state, max_plies)
+        book.prune(min_visits)
+        return book
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build an opening book from a GessRecords game record store")
+    parser.add_argument('store', help="path of the game record file")
+    parser.add_argument('book', help="path of the book file to write")
+    parser.add_argument('--max-plies', type=int, default=MAX_PLIES, help="moves of each game to add")
+    parser.add_argument('--min-visits', type=int, default=MIN_VISITS, help="games a move must be played in")
+    arguments = parser.parse_args()
+    with GameRecordStore(arguments.store) as records:
+        opening_book = OpeningBook.from_records(records, arguments.max_plies, arguments.min_visits)
+    opening_book.save(arguments.book)
+    print("wrote %d positions to %s" % (len(opening_book), arguments.book))
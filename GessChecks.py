@@ -0,0 +1,286 @@
+# Description: Correctness checks of the Gess rules engine -- known perft counts, the fast move generators and ring
+# detectors against slow references, the rule fixes that came with the bitboards, and the on-disk formats.
+# Run it after changing the engine.
+
+import argparse
+import random
+import time
+
+from GessGame import GessGame, Position, DIRECTIONS, GAME_STATES, PACKED_SIZE, MoveReason, square_bit
+from GessPerft import perft, KNOWN_COUNTS
+from GessSearch import WIN_SCORE
+from GessTransposition import (pack_entry, unpack_entry, encode_move, decode_move, DEPTH_BITS, VALUE_OFFSET,
+                               GENERATION_BITS, EXACT, LOWER_BOUND, UPPER_BOUND)
+
+SEED = 20200525                     # every sampled position is generated from this seed, so runs are comparable
+SAMPLE_GAMES = 3                    # random games positions are sampled from
+SAMPLE_PLIES = (0, 15, 40)          # plies into each game the positions are taken at
+BATCH_QUERIES = 3000                # moves checked by the batch validation check
+
+
+def ring(center):
+    """Returns the 8 squares around center, the stones of a ring there"""
+    return [(center[0] + column, center[1] + row) for row in (-1, 0, 1) for column in (-1, 0, 1) if column or row]
+
+
+def game_with(black, white, current_player='BLACK'):
+    """
+    Returns a new game at the position with stones on the (column, row) squares listed for each color (a square may
+    be listed more than once, as when rings share stones)
+    """
+    board = [sum(square_bit(square) for square in set(black)), sum(square_bit(square) for square in set(white))]
+    return GessGame(Position(board, current_player))
+
+
+def sample_positions(seed=SEED, games=SAMPLE_GAMES, plies=SAMPLE_PLIES):
+    """Returns unfinished games at the given plies into games random games played from the starting position"""
+    generator = random.Random(seed)
+    positions = []
+    for _ in range(games):
+        game = GessGame()
+        for ply in range(max(plies) + 1):
+            if game.get_game_state() != 'UNFINISHED':
+                break
+            if ply in plies:
+                positions.append(game.clone())
+            moves = list(game.legal_moves())
+            if not moves:
+                break
+            center_from, center_to = generator.choice(moves)
+            game.push_move(center_from, center_to)
+    return positions
+
+
+def check_perft():
+    """perft from the starting position agrees with KNOWN_COUNTS"""
+    failures = []
+    for depth, count in sorted(KNOWN_COUNTS.items()):
+        nodes = perft(GessGame(), depth)
+        if nodes != count:
+            failures.append("perft(%d) = %d, expected %d" % (depth, nodes, count))
+    return failures
+
+
+def check_legal_moves():
+    """legal_moves yields exactly the moves validate_move accepts, out of every pair of centers off the gutter"""
+    failures = []
+    centers = [(column, row) for row in range(1, 19) for column in range(1, 19)]
+    for game in sample_positions():
+        valid = set()
+        ring_losing = set()
+        for center_from in centers:
+            if game.check_piece(center_from) != MoveReason.VALID:
+                continue
+            for center_to in centers:
+                reason = game.validate_move(center_from, center_to)
+                if reason == MoveReason.VALID:
+                    valid.add((center_from, center_to))
+                elif reason == MoveReason.SELF_RING_LOSS:
+                    ring_losing.add((center_from, center_to))
+        if set(game.legal_moves()) != valid:
+            failures.append("legal_moves differs from validate_move at " + game.to_fen())
+        if set(game.legal_moves(allow_ring_loss=True)) != valid | ring_losing:
+            failures.append("legal_moves(allow_ring_loss=True) differs from validate_move at " + game.to_fen())
+    return failures
+
+
+def check_batch_validation():
+    """GessArrays.validate_moves gives the same reasons as validate_move, on legal and illegal moves alike"""
+    try:
+        import numpy as np
+        import GessArrays
+    except ImportError:                                 # the batch validator needs NumPy
+        return None
+    generator = random.Random(SEED)
+    positions = sample_positions()
+    queries = []
+    for _ in range(BATCH_QUERIES):
+        game = generator.choice(positions)
+        if generator.random() < 0.3:
+            move = generator.choice(list(game.legal_moves(allow_ring_loss=True)))
+        else:                                           # mostly straight lines, so every rule gets to reject some
+            center_from = (generator.randrange(20), generator.randrange(20))
+            column_step, row_step = generator.choice(list(DIRECTIONS.values()))
+            distance = generator.randrange(9)
+            center_to = (center_from[0] + column_step * distance + generator.choice((0, 0, 0, 1)),
+                         center_from[1] + row_step * distance)
+            move = center_from, center_to
+        queries.append((game, move))
+    boards = np.stack([GessArrays.game_to_array(game) for game, move in queries])
+    players = [GessArrays.BLACK if game.get_current_player() == 'BLACK' else GessArrays.WHITE for game, move in queries]
+    moves = [(move[0][0], move[0][1], move[1][0], move[1][1]) for game, move in queries]
+    legal, reasons = GessArrays.validate_moves(boards, players, moves)
+    failures = []
+    for (game, move), reason in zip(queries, reasons):
+        expected = game.validate_move(move[0], move[1])
+        if reason != expected:
+            failures.append("validate_moves gives %s for %s-%s, validate_move %s at %s"
+                            % (MoveReason(reason).name, game.convert_to_string(move[0]),
+                               game.convert_to_string(move[1]), MoveReason(expected).name, game.to_fen()))
+    return failures
+
+
+def check_rules():
+    """The rule fixes of the bitboard engine: diagonal blockage, the a19 and t19 gutter squares, the last ring"""
+    failures = []
+    black_ring = ring((10, 10))                         # one ring each, well away from the pieces moved below
+    white_ring = ring((10, 3))
+    piece = [(6, 6)]                                    # a piece around f6 that can only move southeast
+    cases = [
+        ("a stone in a footprint the diagonal move passes through blocks it",
+         game_with(piece + black_ring, white_ring + [(7, 7)]), ((5, 5), (8, 8)), MoveReason.BLOCKED),
+        ("a stone beside the path of a diagonal move does not block it",
+         game_with(piece + black_ring, white_ring + [(7, 4)]), ((5, 5), (8, 8)), MoveReason.VALID),
+        ("moving the last ring onto the board's edge breaks it in the gutter",
+         game_with(ring((3, 10)), white_ring), ((3, 10), (1, 10)), MoveReason.SELF_RING_LOSS),
+        ("moving the last ring clear of the gutter keeps it",
+         game_with(ring((3, 10)), white_ring), ((3, 10), (5, 10)), MoveReason.VALID),
+    ]
+    for description, game, move, expected in cases:
+        reason = game.validate_move(move[0], move[1])
+        if reason != expected:
+            failures.append("%s: got %s, expected %s" % (description, MoveReason(reason).name, expected.name))
+    # stones pushed onto a19 and t19 are cleaned off like the rest of the gutter
+    for corner, center_from, center_to, gutter_square in (((2, 16), (3, 15), (1, 17), (0, 18)),
+                                                          ((17, 16), (16, 15), (18, 17), (19, 18))):
+        game = game_with([corner] + black_ring, white_ring)
+        if game.validate_move(center_from, center_to) != MoveReason.VALID:
+            failures.append("could not push a stone onto %s" % game.convert_to_string(gutter_square))
+            continue
+        game.push_move(center_from, center_to)
+        if game.get_stones('BLACK') & square_bit(gutter_square):
+            failures.append("the stone pushed onto %s was not cleaned off" % game.convert_to_string(gutter_square))
+    return failures
+
+
+def check_position():
+    """Position fields cannot be set or deleted, so shared positions (STARTING_POSITION, undo stacks) stay as made"""
+    failures = []
+    position = GessGame().get_position()
+    for field in Position.__slots__:
+        for attempt, change in (("set", lambda: setattr(position, field, 0)),
+                                ("deleted", lambda: delattr(position, field))):
+            try:
+                change()
+            except AttributeError:
+                continue
+            failures.append("Position.%s can be %s" % (field, attempt))
+    return failures
+
+
+def ring_positions():
+    """
+    Returns the sampled positions plus boards crowded with rings: neighbouring rings sharing stones, rings next to
+    the gutter and rings cut off by it, and a filled 3x3 block, which is not a ring
+    """
+    crowded = [game_with(ring((5, 5)) + ring((7, 5)) + ring((1, 10)), ring((12, 12)) + [(12, 12)] + ring((18, 18))),
+               game_with(ring((10, 2)) + ring((10, 4)), ring((2, 17)) + ring((17, 2)), 'WHITE')]
+    return sample_positions() + crowded
+
+
+def check_codec():
+    """
+    Positions survive the 101-byte codec and FEN unchanged, and transposition table entries survive pack_entry at the
+    edges of every field
+    """
+    failures = []
+    positions = [game.get_position() for game in ring_positions()]
+    positions += [Position(positions[-1].get_board(), player, game_state)
+                  for player in ('BLACK', 'WHITE') for game_state in GAME_STATES]
+    for position in positions:
+        data = position.to_bytes()
+        if len(data) != PACKED_SIZE:
+            failures.append("to_bytes gives %d bytes, expected %d" % (len(data), PACKED_SIZE))
+        if Position.from_bytes(data) != position:
+            failures.append("to_bytes does not round-trip " + position.to_fen())
+        if Position.from_fen(position.to_fen()) != position:
+            failures.append("to_fen does not round-trip " + position.to_fen())
+        game = GessGame(position)
+        if GessGame.from_bytes(game.to_bytes()).get_position() != position:
+            failures.append("GessGame.to_bytes does not round-trip " + position.to_fen())
+        if GessGame.from_fen(game.to_fen()).get_position() != position:
+            failures.append("GessGame.to_fen does not round-trip " + position.to_fen())
+    for data in (b'', positions[0].to_bytes()[:-1], bytes([len(GAME_STATES) << 1]) + bytes(PACKED_SIZE - 1)):
+        try:
+            Position.from_bytes(data)
+        except ValueError:
+            continue
+        failures.append("from_bytes accepts %d bad bytes" % len(data))
+    largest_move = ((19, 19), (19, 19))
+    if decode_move(encode_move(largest_move)) != largest_move or decode_move(encode_move(None)) is not None:
+        failures.append("encode_move does not round-trip")
+    for value in (-VALUE_OFFSET, -WIN_SCORE - 1, -1, 0, WIN_SCORE + 1, VALUE_OFFSET - 1):
+        for flag in (EXACT, LOWER_BOUND, UPPER_BOUND):
+            for depth, move, generation in ((0, None, 0), ((1 << DEPTH_BITS) - 1, largest_move,
+                                                           (1 << GENERATION_BITS) - 1)):
+                entry = (depth, value, flag, encode_move(move), generation)
+                data = pack_entry(*entry)
+                if data == 0 or data >= 1 << 64 or unpack_entry(data) != entry:
+                    failures.append("pack_entry does not round-trip %r" % (entry,))
+    return failures
+
+
+def check_numpy_rings():
+    """GessArrays.find_rings and count_rings find the rings GessGame does, one board at a time and in a batch"""
+    try:
+        import numpy as np
+        import GessArrays
+    except ImportError:                                 # the NumPy ring detector needs NumPy
+        return None
+    failures = []
+    games = ring_positions()
+    boards = np.stack([GessArrays.game_to_array(game) for game in games])
+    counts = GessArrays.count_rings(boards)
+    for game, board, batch_counts in zip(games, boards, counts):
+        black_rings, white_rings = GessArrays.find_rings(board)
+        found = [GessArrays.array_to_mask(black_rings), GessArrays.array_to_mask(white_rings)]
+        expected = [game.get_ring_centers('BLACK'), game.get_ring_centers('WHITE')]
+        if found != expected:
+            failures.append("find_rings differs from get_ring_centers at " + game.to_fen())
+        position = game.get_position()
+        if list(batch_counts) != [position.get_ring_count('BLACK'), position.get_ring_count('WHITE')]:
+            failures.append("count_rings differs from the ring counts at " + game.to_fen())
+    return failures
+
+
+CHECKS = {
+    'perft': check_perft,
+    'legal_moves': check_legal_moves,
+    'batch_validation': check_batch_validation,
+    'rules': check_rules,
+    'position': check_position,
+    'codec': check_codec,
+    'numpy_rings': check_numpy_rings,
+}
+
+
+def run(names=None):
+    """
+    Runs the checks called names (every check by default), printing their failures. Each check returns its failures,
+    or None when it cannot run here. Returns the names of the checks that failed.
+    """
+    failed = []
+    for name in names or CHECKS:
+        start = time.perf_counter()
+        failures = CHECKS[name]()
+        if failures is None:
+            print("%-18s skipped (missing dependency)" % name)
+            continue
+        print("%-18s %s in %.1fs" % (name, "FAILED" if failures else "ok", time.perf_counter() - start))
+        for failure in failures:
+            print("    " + failure)
+        if failures:
+            failed.append(name)
+    return failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the Gess rules engine")
+    parser.add_argument('names', nargs='*', help="checks to run (default all): " + ", ".join(CHECKS))
+    arguments = parser.parse_args()
+    unknown = set(arguments.names) - set(CHECKS)
+    if unknown:
+        parser.error("unknown checks: " + ", ".join(sorted(unknown)))
+    failed_checks = run(arguments.names)
+    if failed_checks:
+        raise SystemExit("failed: " + ", ".join(failed_checks))
@@ -0,0 +1,157 @@
+# Description: Persistent cache of proven endgame results, keyed on GessGame.get_position_hash()
+
+import os
+import sqlite3
+
+from GessGame import count_bits
+
+WIN = 1                             # the player to move can force a win
+LOSS = -1                           # the player to move loses whatever they play
+UNKNOWN = 0                         # searched without finding a forced result
+ENDGAME_STONES = 40                 # positions with at most this many stones on the board are endgame positions
+MAX_ENTRIES = 1 << 20               # default size cap of a cache
+FLUSH_EVERY = 4096                  # unwritten results and uses that make a cache flush without waiting for the search
+
+
+def signed_hash(position_hash):
+    """Maps a 64-bit position hash onto SQLite's signed 64-bit integers"""
+    if position_hash >= 1 << 63:
+        return position_hash - (1 << 64)
+    return position_hash
+
+
+def is_endgame(game):
+    """Returns True if few enough stones are left on game's board for its results to be cached"""
+    return count_bits(game.get_stones('BLACK') | game.get_stones('WHITE')) <= ENDGAME_STONES
+
+
+class EndgameCache:
+    """
+    Represents an on-disk store of endgame results, each a result (WIN, LOSS or UNKNOWN) for the player to move and
+    its distance in plies (moves by either player) to the end of the game. When the store holds more than
+    max_entries results, the least recently used are evicted.
+    Several processes can share one store, each through its own connection: pickling sends only the path, and a cache
+    inherited through fork() (as multiprocessing pool initargs are on Linux) reconnects the first time the child uses
+    it, since SQLite connections must not be used across fork().
+    Lookups only read the database. New results and the use stamps of the results looked up are kept in memory and
+    written by flush (searches call it when they finish) in one short transaction, which is also when the size cap
+    is enforced, so no process holds the database's write lock while it searches.
+    """
+
+    def __init__(self, path, max_entries=MAX_ENTRIES, timeout=30):
+        """Opens (or creates) the cache stored in the SQLite database at path, waiting up to timeout seconds for locks"""
+        self._path = path
+        self._max_entries = max_entries
+        self._timeout = timeout
+        self._pid = os.getpid()                 # process the connection was opened in
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)    # transactions are explicit
+        self._connection.execute("CREATE TABLE IF NOT EXISTS endgame (position_hash INTEGER PRIMARY KEY, "
+                                 "result INTEGER NOT NULL, distance INTEGER NOT NULL, used INTEGER NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS endgame_used ON endgame (used)")
+        self._pending = {}                      # position hash key -> (result, distance) stored since the last flush
+        self._used = {}                         # position hash key -> order of its last use since the last flush
+        self._inherited = None                  # connection of the parent process after a fork, kept but never used
+
+    def __getstate__(self):
+        """Pickles the cache as its path, size cap and lock timeout; the unpickled copy opens its own connection"""
+        return {'path': self._path, 'max_entries': self._max_entries, 'timeout': self._timeout}
+
+    def __setstate__(self, state):
+        """Opens the cache pickled by __getstate__"""
+        self.__init__(state['path'], state['max_entries'], state['timeout'])
+
+    def __len__(self):
+        """Returns the number of results written to the database (results not yet flushed are not counted)"""
+        return self.get_connection().execute("SELECT COUNT(*) FROM endgame").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_connection(self):
+        """
+        Returns the cache's connection to its database, first opening a new one if the cache was inherited through
+        fork(). The parent's connection is kept open but untouched, and the parent's unflushed results are left
+        for the parent to write.
+        """
+        if self._pid != os.getpid():
+            self._inherited = self._connection
+            self._pending.clear()
+            self._used.clear()
+            self._pid = os.getpid()
+            self._connection = sqlite3.connect(self._path, timeout=self._timeout, isolation_level=None)
+        return self._connection
+
+    def get_max_entries(self):
+        """Returns the size cap of the cache"""
+        return self._max_entries
+
+    def mark_used(self, key):
+        """Records a use of the result stored under key, for the LRU order written by flush"""
+        self._used.pop(key, None)               # dicts keep insertion order, so the latest use goes last
+        self._used[key] = True
+        if len(self._used) + len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def probe(self, position_hash):
+        """Returns (result, distance) stored for the position hash and marks it as used, or None if it is not stored"""
+        connection = self.get_connection()
+        key = signed_hash(position_hash)
+        row = self._pending.get(key)
+        if row is None:
+            row = connection.execute("SELECT result, distance FROM endgame WHERE position_hash = ?",
+                                     (key,)).fetchone()
+            if row is None:
+                return None
+        self.mark_used(key)
+        return tuple(row)
+
+    def store(self, position_hash, result, distance):
+        """Stores the result for the position hash (written to the database by the next flush)"""
+        self.get_connection()                   # a forked cache drops its parent's results before buffering
+        key = signed_hash(position_hash)
+        self._pending[key] = (result, distance)
+        self.mark_used(key)
+
+    def clear(self):
+        """Removes every result"""
+        connection = self.get_connection()
+        self._pending.clear()
+        self._used.clear()
+        connection.execute("DELETE FROM endgame")
+
+    def flush(self):
+        """
+        Writes the results stored and the uses made since the last flush, then evicts the least recently used results
+        while the database holds more than max_entries, all in one transaction
+        """
+        connection = self.get_connection()
+        if not self._pending and not self._used:
+            return
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            clock = connection.execute("SELECT MAX(used) FROM endgame").fetchone()[0] or 0
+            stamps = {key: clock + order for order, key in enumerate(self._used, 1)}
+            connection.executemany("INSERT INTO endgame VALUES (?, ?, ?, ?) ON CONFLICT (position_hash) DO UPDATE "
+                                   "SET result = excluded.result, distance = excluded.distance, used = excluded.used",
+                                   [(key, result, distance, stamps[key])
+                                    for key, (result, distance) in self._pending.items()])
+            connection.executemany("UPDATE endgame SET used = ? WHERE position_hash = ?",
+                                   [(stamp, key) for key, stamp in stamps.items() if key not in self._pending])
+            excess = connection.execute("SELECT COUNT(*) FROM endgame").fetchone()[0] - self._max_entries
+            if excess > 0:
+                connection.execute("DELETE FROM endgame WHERE position_hash IN "
+                                   "(SELECT position_hash FROM endgame ORDER BY used LIMIT ?)", (excess,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self._pending.clear()
+        self._used.clear()
+
+    def close(self):
+        """Flushes and closes the cache"""
+        self.flush()
+        self._connection.close()                # the inherited connection, if any, belongs to the parent
@@ -2,54 +2,633 @@
 # Date: 5/25/2020
 # Description: Gess Game
 
+import random
+import time
+from enum import IntEnum
+
+
+# The board is stored as two 400-bit integers (one per color). Square (column, row) is bit row * 20 + column,
+# so a3 is bit 40 and t20 is bit 399. Every rule check below is a handful of shifts and masks over those integers.
+BOARD_SIZE = 20
+FULL_MASK = (1 << BOARD_SIZE * BOARD_SIZE) - 1
+FOOTPRINT_BASE = 0b111 | 0b111 << BOARD_SIZE | 0b111 << 2 * BOARD_SIZE     # 3x3 footprint centered on b2
+RING_ZONE_BASE = sum(0b11111 << row * BOARD_SIZE for row in range(5))      # 5x5 block of ring centers around c3
+INTERIOR_MASK = sum(((1 << BOARD_SIZE - 2) - 1) << row * BOARD_SIZE + 1    # every square outside the gutters (b2 - s19)
+                    for row in range(1, BOARD_SIZE - 1))
+NEIGHBOR_OFFSETS = (-21, -20, -19, -1, 1, 19, 20, 21)                       # bit offsets of the 8 squares around a center
+DIRECTIONS = {'north': (0, -1), 'south': (0, 1), 'east': (1, 0), 'west': (-1, 0),
+              'northeast': (1, -1), 'northwest': (-1, -1), 'southeast': (1, 1), 'southwest': (-1, 1)}
+COLOR_INDEX = {'B': 0, 'W': 1}                                              # position of each color's mask in a board
+ZOBRIST_SEED = 20200525                                                     # fixed so hashes agree across processes and runs
+
+STARTING_BOARD = [ # A    B    C    D    E    F    G    H    I    J    K    L    M    N    O    P    Q    R    S    T
+                 [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #1
+                 [' ', ' ', 'B', ' ', 'B', ' ', 'B', 'B', 'B', 'B', 'B', 'B', 'B', 'B', ' ', 'B', ' ', 'B', ' ', ' '], #2
+                 [' ', 'B', 'B', 'B', ' ', 'B', ' ', 'B', 'B', 'B', 'B', ' ', 'B', ' ', 'B', ' ', 'B', 'B', 'B', ' '], #3
+                 [' ', ' ', 'B', ' ', 'B', ' ', 'B', 'B', 'B', 'B', 'B', 'B', 'B', 'B', ' ', 'B', ' ', 'B', ' ', ' '], #4
+                 [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #5
+                 [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #6
+                 [' ', ' ', 'B', ' ', ' ', 'B', ' ', ' ', 'B', ' ', ' ', 'B', ' ', ' ', 'B', ' ', ' ', 'B', ' ', ' '], #7
+                 [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #8
+                 [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #9
+                 [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #10
+                 [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #11
+                 [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #12
+                 [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #13
+                 [' ', ' ', 'W', ' ', ' ', 'W', ' ', ' ', 'W', ' ', ' ', 'W', ' ', ' ', 'W', ' ', ' ', 'W', ' ', ' '], #14
+                 [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #15
+                 [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #16
+                 [' ', ' ', 'W', ' ', 'W', ' ', 'W', 'W', 'W', 'W', 'W', 'W', 'W', 'W', ' ', 'W', ' ', 'W', ' ', ' '], #17
+                 [' ', 'W', 'W', 'W', ' ', 'W', ' ', 'W', 'W', 'W', 'W', ' ', 'W', ' ', 'W', ' ', 'W', 'W', 'W', ' '], #18
+                 [' ', ' ', 'W', ' ', 'W', ' ', 'W', 'W', 'W', 'W', 'W', 'W', 'W', 'W', ' ', 'W', ' ', 'W', ' ', ' '], #19
+                 [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #20
+                 ]
+
+
+def square_index(center):
+    """Returns the position (row * 20 + column) of the center provided in a mask and in the lookup tables"""
+    return center[1] * BOARD_SIZE + center[0]
+
+
+def square_bit(center):
+    """Returns the mask holding only the square at the center provided (column, row)"""
+    return 1 << center[1] * BOARD_SIZE + center[0]
+
+
+def footprint(center):
+    """Returns the mask of the 3x3 footprint around the center provided (center must not be in the gutter)"""
+    return FOOTPRINTS[center[1] * BOARD_SIZE + center[0]]
+
+
+def ring_zone(center):
+    """
+    Returns the mask of every interior center whose 3x3 footprint overlaps the footprint of the center provided.
+    These are the only rings a piece at that center can make or break when it leaves or lands.
+    """
+    return RING_ZONES[center[1] * BOARD_SIZE + center[0]]
+
+
+def make_center_tables():
+    """
+    Builds the lookup tables for every center off the gutter, indexed by square_index (gutter entries are unused):
+    - the center's 3x3 footprint mask
+    - the center's ring zone (see ring_zone)
+    - for each direction, (pointer, steps): pointer is the square that needs one of the player's stones for the piece
+      to move that way, and steps lists (center_to, leading edge, swept) for every distance before the gutter. The
+      leading edge is the part of that step's footprint the piece has not covered yet, and swept is every square the
+      piece has covered up to that step, less its starting footprint.
+    """
+    footprints = [0] * (BOARD_SIZE * BOARD_SIZE)
+    ring_zones = [0] * (BOARD_SIZE * BOARD_SIZE)
+    rays = [None] * (BOARD_SIZE * BOARD_SIZE)
+    for row in range(1, BOARD_SIZE - 1):
+        for column in range(1, BOARD_SIZE - 1):
+            index = row * BOARD_SIZE + column
+            footprints[index] = FOOTPRINT_BASE << index - BOARD_SIZE - 1
+            ring_zones[index] = shift(RING_ZONE_BASE, index - 2 * BOARD_SIZE - 2) & INTERIOR_MASK
+    for row in range(1, BOARD_SIZE - 1):
+        for column in range(1, BOARD_SIZE - 1):
+            index = row * BOARD_SIZE + column
+            rays[index] = {}
+            for direction, (column_step, row_step) in DIRECTIONS.items():
+                steps = []
+                covered = footprints[index]
+                swept = 0
+                center_to = column + column_step, row + row_step
+                while 0 < center_to[0] < BOARD_SIZE - 1 and 0 < center_to[1] < BOARD_SIZE - 1:
+                    landing = footprints[square_index(center_to)]
+                    edge = landing & ~covered
+                    swept |= edge
+                    steps.append((center_to, edge, swept))
+                    covered = landing
+                    center_to = center_to[0] + column_step, center_to[1] + row_step
+                rays[index][direction] = (square_bit((column + column_step, row + row_step)), steps)
+    return footprints, ring_zones, rays
+
+
+def shift(mask, offset):
+    """Moves every bit of the mask by offset squares (positive offsets move toward t20)"""
+    if offset >= 0:
+        return (mask << offset) & FULL_MASK
+    return mask >> -offset
+
+
+def find_rings(stones, empty, centers=INTERIOR_MASK):
+    """
+    Returns the mask of every empty center (out of the centers provided) whose 8 surrounding squares all hold the
+    stones provided
+    """
+    rings = empty & centers & INTERIOR_MASK
+    for offset in NEIGHBOR_OFFSETS:
+        if rings == 0:                                  # no candidates left, nothing more to check
+            break
+        rings &= shift(stones, -offset)                 # line up each neighbour with its center
+    return rings
+
+
+def count_bits(mask):
+    """Returns the number of squares set in the mask"""
+    return bin(mask).count('1')
+
+
+FOOTPRINTS, RING_ZONES, RAYS = make_center_tables()
+CENTERS = [(square_index((column, row)), (column, row))                    # every center a piece may have
+           for row in range(1, BOARD_SIZE - 1) for column in range(1, BOARD_SIZE - 1)]
+
+
+class MoveReason(IntEnum):
+    """Why a move was accepted or rejected, as returned by GessGame.validate_move"""
+    VALID = 0
+    GAME_OVER = 1                   # the game has already been won
+    GUTTER_CENTER = 2               # the piece's center is in the gutter
+    ENEMY_STONE = 3                 # the piece contains the other player's stones
+    GUTTER_DESTINATION = 4          # the proposed center is in the gutter
+    BAD_DIRECTION = 5               # the piece has no stone pointing in the direction of the move
+    TOO_FAR = 6                     # a piece without a center stone moved more than three squares
+    BLOCKED = 7                     # there are stones in the way
+    SELF_RING_LOSS = 8              # the move leaves the player without a ring
+
+
+MOVE_MESSAGES = {
+    MoveReason.GAME_OVER: "This move is invalid because the game is already over.",
+    MoveReason.GUTTER_CENTER: "This piece is invalid because its center is on the board's outermost row or column",
+    MoveReason.ENEMY_STONE: "This piece is invalid because it contains the other player's stones.",
+    MoveReason.GUTTER_DESTINATION: "This move is invalid because the proposed center is in the board's outermost row or column.",
+    MoveReason.BAD_DIRECTION: "This move is invalid because it is in a direction that is not allowed for the chosen piece.",
+    MoveReason.TOO_FAR: "This move is invalid because it is further than the current piece is permitted to move",
+    MoveReason.BLOCKED: "This move is invalid because there are stones in the way.",
+    MoveReason.SELF_RING_LOSS: "This move is invalid because it eliminates the current player's last ring",
+}
+
+
+def make_zobrist_keys(seed):
+    """Returns a 64-bit key for every (color, square) and a key for white to move, generated from seed"""
+    generator = random.Random(seed)
+    square_keys = [[generator.getrandbits(64) for _ in range(BOARD_SIZE * BOARD_SIZE)] for _ in COLOR_INDEX]
+    return square_keys, generator.getrandbits(64)
+
+
+ZOBRIST_KEYS, ZOBRIST_WHITE_TO_MOVE = make_zobrist_keys(ZOBRIST_SEED)
+
+
+def hash_squares(color, mask):
+    """Returns the XOR of the Zobrist keys of color (0 black, 1 white) for every square set in the mask"""
+    keys = ZOBRIST_KEYS[color]
+    position_hash = 0
+    while mask:
+        lowest = mask & -mask
+        position_hash ^= keys[lowest.bit_length() - 1]
+        mask ^= lowest
+    return position_hash
+
+
+def hash_board(board, current_player):
+    """Returns the Zobrist hash of a [black, white] mask board with current_player ('BLACK' or 'WHITE') to move"""
+    position_hash = hash_squares(0, board[0]) ^ hash_squares(1, board[1])
+    if current_player == 'WHITE':
+        position_hash ^= ZOBRIST_WHITE_TO_MOVE
+    return position_hash
+
+
+def board_from_rows(rows):
+    """Converts a 20x20 list of 'B', 'W' and ' ' strings into a [black, white] mask board"""
+    board = [0, 0]
+    for row_number, row in enumerate(rows):
+        for column_number, elem in enumerate(row):
+            if elem in COLOR_INDEX:
+                board[COLOR_INDEX[elem]] |= square_bit((column_number, row_number))
+    return board
+
+
+def board_to_rows(board):
+    """Converts a [black, white] mask board into a 20x20 list of 'B', 'W' and ' ' strings"""
+    rows = []
+    for row_number in range(BOARD_SIZE):
+        row = []
+        for column_number in range(BOARD_SIZE):
+            bit = square_bit((column_number, row_number))
+            if board[0] & bit:
+                row.append('B')
+            elif board[1] & bit:
+                row.append('W')
+            else:
+                row.append(' ')
+        rows.append(row)
+    return rows
+
+
+def make_packing_tables():
+    """
+    Returns the tables used to pack a board at 2 bits per square (0 empty, 1 black, 2 white), four squares per byte:
+    pack maps (black nibble << 4 | white nibble) to a byte, and unpack maps a byte back to (black nibble, white
+    nibble), or None for a byte with a square that is neither empty, black nor white.
+    """
+    pack = [0] * 256
+    unpack = [None] * 256
+    for black in range(16):
+        for white in range(16):
+            if black & white:                               # a square cannot hold two stones
+                continue
+            byte = 0
+            for square in range(4):
+                byte |= ((black >> square & 1) | (white >> square & 1) << 1) << 2 * square
+            pack[black << 4 | white] = byte
+            unpack[byte] = black, white
+    return pack, unpack
+
+
+PACK_NIBBLES, UNPACK_BYTE = make_packing_tables()
+MASK_BYTES = BOARD_SIZE * BOARD_SIZE // 8                                   # bytes in one color's mask
+GAME_STATES = ('UNFINISHED', 'BLACK_WON', 'WHITE_WON')
+# to_bytes: one header byte (bit 0 set if white is to move, bits 1-2 the index of the game state in GAME_STATES)
+# followed by the board packed by pack_board
+PACKED_SIZE = 1 + 2 * MASK_BYTES
+
+
+def pack_board(board):
+    """Packs a [black, white] mask board into 100 bytes, 2 bits per square in square_index order"""
+    black = board[0].to_bytes(MASK_BYTES, 'little')
+    white = board[1].to_bytes(MASK_BYTES, 'little')
+    packed = bytearray(2 * MASK_BYTES)
+    for index in range(MASK_BYTES):
+        packed[2 * index] = PACK_NIBBLES[(black[index] & 15) << 4 | white[index] & 15]
+        packed[2 * index + 1] = PACK_NIBBLES[black[index] & 240 | white[index] >> 4]
+    return bytes(packed)
+
+
+def unpack_board(packed):
+    """Unpacks 100 bytes made by pack_board back into a [black, white] mask board"""
+    black = bytearray(MASK_BYTES)
+    white = bytearray(MASK_BYTES)
+    for index in range(MASK_BYTES):
+        low = UNPACK_BYTE[packed[2 * index]]
+        high = UNPACK_BYTE[packed[2 * index + 1]]
+        if low is None or high is None:
+            raise ValueError("packed board has a square that is neither empty, black nor white")
+        black[index] = low[0] | high[0] << 4
+        white[index] = low[1] | high[1] << 4
+    return [int.from_bytes(black, 'little'), int.from_bytes(white, 'little')]
+
+
+def board_to_fen(board):
+    """
+    Writes a [black, white] mask board as text: rows 1 to 20 separated by '/', each row listing 'B' and 'W' stones
+    from column a to t with runs of empty squares written as numbers (an empty row is '20')
+    """
+    rows = []
+    for row in board_to_rows(board):
+        text = ''
+        empty = 0
+        for elem in row:
+            if elem == ' ':
+                empty += 1
+            else:
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                text += elem
+        if empty:
+            text += str(empty)
+        rows.append(text)
+    return '/'.join(rows)
+
+
+def board_from_fen(text):
+    """Reads a board written by board_to_fen back into a [black, white] mask board"""
+    rows = []
+    for row_text in text.split('/'):
+        row = []
+        run = ''
+        for elem in row_text:
+            if elem.isdigit():
+                run += elem
+                continue
+            if run:
+                row.extend(' ' * int(run))
+                run = ''
+            if elem not in COLOR_INDEX:
+                raise ValueError("unknown square %r in board text" % elem)
+            row.append(elem)
+        if run:
+            row.extend(' ' * int(run))
+        if len(row) != BOARD_SIZE:
+            raise ValueError("board text row %r does not have %d squares" % (row_text, BOARD_SIZE))
+        rows.append(row)
+    if len(rows) != BOARD_SIZE:
+        raise ValueError("board text does not have %d rows" % BOARD_SIZE)
+    return board_from_rows(rows)
+
+
+# methods counted and timed by GessGame.enable_profiling (check_piece and check_move are the silent versions of
+# is_valid_piece and is_valid_move that make_move uses)
+PROFILED_METHODS = ('is_valid_piece', 'is_valid_move', 'check_piece', 'check_move', 'is_blocked', 'move_piece',
+                    'check_for_rings', 'clean_gutters')
+
+
+def profiled(method, counters):
+    """Wraps a bound method so every call adds 1 to counters[0] and its duration in nanoseconds to counters[1]"""
+    def timed_method(*args, **kwargs):
+        start = time.perf_counter_ns()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            counters[0] += 1
+            counters[1] += time.perf_counter_ns() - start
+    return timed_method
+
+
+class Position:
+    """
+    Represents one position as an immutable value: the board (black and white stone masks), the player to move and
+    the game state, with the ring centers, ring counts and Zobrist hash that follow from them.
+    A Position keeps its fields in __slots__, only hands them out through getters and refuses to have them set or
+    deleted, so it is small, never changes once made, can be shared between threads without locks, and hashes on its Zobrist hash for use as a dict key.
+    apply returns the position after a move; GessGame plays from a Position and keeps its history as Positions.
+    """
+
+    __slots__ = ('_black', '_white', '_current_player', '_game_state', '_black_ring_centers', '_white_ring_centers',
+                 '_black_rings', '_white_rings', '_hash')
+
+    def __init__(self, board, current_player='BLACK', game_state='UNFINISHED'):
+        """Makes the position of a [black, white] mask board (stones in the gutters are dropped)"""
+        black = board[0] & INTERIOR_MASK
+        white = board[1] & INTERIOR_MASK
+        empty = ~(black | white)
+        black_ring_centers = find_rings(black, empty)
+        white_ring_centers = find_rings(white, empty)
+        set_field = object.__setattr__                 # __setattr__ refuses, so that nothing else can change a field
+        set_field(self, '_black', black)
+        set_field(self, '_white', white)
+        set_field(self, '_current_player', current_player)
+        set_field(self, '_game_state', game_state)
+        set_field(self, '_black_ring_centers', black_ring_centers)
+        set_field(self, '_white_ring_centers', white_ring_centers)
+        set_field(self, '_black_rings', count_bits(black_ring_centers))
+        set_field(self, '_white_rings', count_bits(white_ring_centers))
+        set_field(self, '_hash', hash_board([black, white], current_player))
+
+    @classmethod
+    def from_fields(cls, black, white, current_player, game_state, black_ring_centers, white_ring_centers,
+                    black_rings, white_rings, position_hash):
+        """
+        Returns a position made straight from all of its fields, without recomputing the rings and hash.
+        The fields must agree with each other, as a GessGame's working copies do.
+        """
+        position = object.__new__(cls)
+        set_field = object.__setattr__
+        set_field(position, '_black', black)
+        set_field(position, '_white', white)
+        set_field(position, '_current_player', current_player)
+        set_field(position, '_game_state', game_state)
+        set_field(position, '_black_ring_centers', black_ring_centers)
+        set_field(position, '_white_ring_centers', white_ring_centers)
+        set_field(position, '_black_rings', black_rings)
+        set_field(position, '_white_rings', white_rings)
+        set_field(position, '_hash', position_hash)
+        return position
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Position is immutable, cannot set %s" % name)
+
+    def __delattr__(self, name):
+        raise AttributeError("Position is immutable, cannot delete %s" % name)
+
+    def __eq__(self, other):
+        """Positions are equal when their boards, players to move and game states are (the rest follows from those)"""
+        return (isinstance(other, Position) and self._hash == other._hash and self._black == other._black and
+                self._white == other._white and self._current_player == other._current_player and
+                self._game_state == other._game_state)
+
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        return 'Position.from_fen(%r)' % self.to_fen()
+
+    def __reduce__(self):
+        """Pickles the position as the arguments __init__ needs to rebuild it"""
+        return Position, ((self._black, self._white), self._current_player, self._game_state)
+
+    def get_board(self):
+        """Returns the board as a (black stones mask, white stones mask) pair"""
+        return self._black, self._white
+
+    def get_current_player(self):
+        """Returns the player whose turn it is ('BLACK' or 'WHITE')"""
+        return self._current_player
+
+    def get_game_state(self):
+        """Returns the state of the game"""
+        return self._game_state
+
+    def get_stones(self, player):
+        """Returns the mask of the squares holding player's ('BLACK' or 'WHITE') stones"""
+        return (self._black, self._white)[COLOR_INDEX[player[0]]]
+
+    def get_ring_centers(self, player):
+        """Returns the mask of the centers of player's ('BLACK' or 'WHITE') rings"""
+        return (self._black_ring_centers, self._white_ring_centers)[COLOR_INDEX[player[0]]]
+
+    def get_ring_count(self, player):
+        """Returns the number of rings player ('BLACK' or 'WHITE') has"""
+        return (self._black_rings, self._white_rings)[COLOR_INDEX[player[0]]]
+
+    def get_position_hash(self):
+        """Returns the 64-bit Zobrist hash of the board and player to move"""
+        return self._hash
+
+    def apply(self, move):
+        """
+        Returns the position after move, a (center_from, center_to) pair of (column, row) centers.
+        Raises ValueError (with the MOVE_MESSAGES text) if the move is illegal.
+        """
+        game = GessGame(self)
+        reason = game.validate_move(move[0], move[1])
+        if reason != MoveReason.VALID:
+            raise ValueError(MOVE_MESSAGES[reason])
+        game.push_move(move[0], move[1])
+        return game.get_position()
+
+    def to_bytes(self):
+        """Returns the position (board, player to move and game state) packed into 101 bytes"""
+        header = (self._current_player == 'WHITE') | GAME_STATES.index(self._game_state) << 1
+        return bytes([header]) + pack_board(self.get_board())
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Returns the position packed by to_bytes"""
+        if len(data) != PACKED_SIZE or data[0] >> 1 >= len(GAME_STATES):
+            raise ValueError("not a packed Gess position")
+        return cls(unpack_board(data[1:]), 'WHITE' if data[0] & 1 else 'BLACK', GAME_STATES[data[0] >> 1])
+
+    def to_fen(self):
+        """
+        Returns the position as one line of text: the board (see board_to_fen), 'b' or 'w' for the player to move,
+        and the game state, e.g. '20/2B1B1B8... b UNFINISHED'
+        """
+        return '%s %s %s' % (board_to_fen(self.get_board()), self._current_player[0].lower(), self._game_state)
+
+    @classmethod
+    def from_fen(cls, text):
+        """Returns the position written by to_fen"""
+        fields = text.split()
+        if len(fields) != 3 or fields[1] not in ('b', 'w') or fields[2] not in GAME_STATES:
+            raise ValueError("not a Gess position: %r" % text)
+        return cls(board_from_fen(fields[0]), 'WHITE' if fields[1] == 'w' else 'BLACK', fields[2])
+
+
+STARTING_POSITION = Position(board_from_rows(STARTING_BOARD))
+
 
 class GessGame:
     """
     Represents a Gess Game.
     Each game is initialized with the same board, (in state unfinished), and starts with current player = black.
+    The game plays from an immutable Position: its fields are unpacked into working copies that moves update in
+    place, get_position packs them back into a Position, and the positions before each move are kept for pop_move.
     """
 
-    def __init__(self):
-        """Initializes members of class GessGame"""
-        self._game_state = 'UNFINISHED'             # 'UNFINISHED', 'BLACK_WON' or 'WHITE_WON'
-        self._current_player = 'BLACK'              # 'BLACK' or 'WHITE' (black goes first)
-        self._black_rings = 0                       # number of rings player has (should never be called without first calling check_for_rings)
-        self._white_rings = 0
-        self._temp_board = []                       # temporary board used for testing move legality
+    def __init__(self, position=STARTING_POSITION):
+        """Initializes members of class GessGame, at the starting position unless another Position is given"""
+        self._undo_stack = []                       # the Position before each move made, used by pop_move to take it back
+        self._move_reason = MoveReason.VALID        # why the last make_move was accepted or rejected
         self._move_direction = ''                   # player's current move direction (only if valid)
-        self._board = [ # A    B    C    D    E    F    G    H    I    J    K    L    M    N    O    P    Q    R    S    T
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #1
-                        [' ', ' ', 'B', ' ', 'B', ' ', 'B', 'B', 'B', 'B', 'B', 'B', 'B', 'B', ' ', 'B', ' ', 'B', ' ', ' '], #2
-                        [' ', 'B', 'B', 'B', ' ', 'B', ' ', 'B', 'B', 'B', 'B', ' ', 'B', ' ', 'B', ' ', 'B', 'B', 'B', ' '], #3
-                        [' ', ' ', 'B', ' ', 'B', ' ', 'B', 'B', 'B', 'B', 'B', 'B', 'B', 'B', ' ', 'B', ' ', 'B', ' ', ' '], #4
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #5
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #6
-                        [' ', ' ', 'B', ' ', ' ', 'B', ' ', ' ', 'B', ' ', ' ', 'B', ' ', ' ', 'B', ' ', ' ', 'B', ' ', ' '], #7
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #8
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #9
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #10
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #11
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #12
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #13
-                        [' ', ' ', 'W', ' ', ' ', 'W', ' ', ' ', 'W', ' ', ' ', 'W', ' ', ' ', 'W', ' ', ' ', 'W', ' ', ' '], #14
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #15
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #16
-                        [' ', ' ', 'W', ' ', 'W', ' ', 'W', 'W', 'W', 'W', 'W', 'W', 'W', 'W', ' ', 'W', ' ', 'W', ' ', ' '], #17
-                        [' ', 'W', 'W', 'W', ' ', 'W', ' ', 'W', 'W', 'W', 'W', ' ', 'W', ' ', 'W', ' ', 'W', 'W', 'W', ' '], #18
-                        [' ', ' ', 'W', ' ', 'W', ' ', 'W', 'W', 'W', 'W', 'W', 'W', 'W', 'W', ' ', 'W', ' ', 'W', ' ', ' '], #19
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #20
-                        ]
+        self._profile = None                        # {method name: [calls, nanoseconds]} once profiling is enabled
+        self.load_position(position)
+
+    def load_position(self, position):
+        """
+        Unpacks a Position into the game's working fields: board, player, game state, rings and hash.
+        Its fields are read directly rather than through its getters, as this runs on every pop_move.
+        """
+        self._board = [position._black, position._white]            # [black stones mask, white stones mask]
+        self._current_player = position._current_player              # 'BLACK' or 'WHITE' (black goes first)
+        self._game_state = position._game_state                      # 'UNFINISHED', 'BLACK_WON' or 'WHITE_WON'
+        self._rings = [position._black_ring_centers, position._white_ring_centers]    # [black, white] ring centers
+        self._black_rings = position._black_rings                    # number of rings each player has
+        self._white_rings = position._white_rings
+        self._hash = position._hash                                  # Zobrist hash, kept up to date by every move
+
+    def get_position(self):
+        """Returns the current position as an immutable Position"""
+        return Position.from_fields(self._board[0], self._board[1], self._current_player, self._game_state,
+                                    self._rings[0], self._rings[1], self._black_rings, self._white_rings, self._hash)
+
+    def set_position(self, board, current_player, game_state='UNFINISHED'):
+        """
+        Replaces the game's position with a [black, white] mask board, the player to move and the game state.
+        Rings and the position hash are recomputed and the moves made so far can no longer be taken back.
+        """
+        self.load_position(Position(board, current_player, game_state))
+        self._undo_stack = []
+
+    def to_bytes(self):
+        """
+        Returns the position (board, player to move and game state) packed into 101 bytes.
+        The moves made so far are not included.
+        """
+        return self.get_position().to_bytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Returns a new game at the position packed by to_bytes"""
+        game = cls()
+        game.load_position(Position.from_bytes(data))
+        return game
+
+    def to_fen(self):
+        """
+        Returns the position as one line of text: the board (see board_to_fen), 'b' or 'w' for the player to move,
+        and the game state, e.g. '20/2B1B1B8... b UNFINISHED'
+        """
+        return self.get_position().to_fen()
+
+    @classmethod
+    def from_fen(cls, text):
+        """Returns a new game at the position written by to_fen"""
+        game = cls()
+        game.load_position(Position.from_fen(text))
+        return game
 
     def get_board(self):
         """Prints board"""
         print("  A    B    C    D    E    F    G    H    I    J    K    L    M    N    O    P    Q    R    S    T")
-        for row in self._board:
+        for row in board_to_rows(self._board):
             print(row)
 
     def get_game_state(self):
         """Returns the state of the game"""
         return self._game_state
 
+    def get_current_player(self):
+        """Returns the player whose turn it is ('BLACK' or 'WHITE')"""
+        return self._current_player
+
+    def get_stones(self, player):
+        """Returns the mask of the squares holding player's ('BLACK' or 'WHITE') stones"""
+        return self._board[COLOR_INDEX[player[0]]]
+
+    def get_ring_centers(self, player):
+        """Returns the mask of the centers of player's ('BLACK' or 'WHITE') rings"""
+        return self._rings[COLOR_INDEX[player[0]]]
+
+    def get_position_hash(self):
+        """Returns the 64-bit Zobrist hash of the board and player to move"""
+        return self._hash
+
+    def clone(self):
+        """
+        Returns an independent copy of the game, for exploring variations.
+        The board and ring masks are immutable ints, so the copy shares them with the game and only the small lists
+        holding them (and the undo stack's list of immutable records) are copied. Profiling is not carried over.
+        """
+        copy = object.__new__(type(self))                                  # skips __init__'s ring scan and hashing
+        copy.__dict__.update(self.__getstate__())
+        copy._board = self._board[:]
+        copy._rings = self._rings[:]
+        copy._undo_stack = self._undo_stack[:]           # of immutable Positions
+        copy._profile = None
+        return copy
+
+    def enable_profiling(self):
+        """
+        Starts counting calls to the PROFILED_METHODS of this game and timing them (times include nested calls).
+        The methods are wrapped on this instance only, so games that never enable profiling run unchanged code.
+        """
+        if self._profile is None:
+            self._profile = {name: [0, 0] for name in PROFILED_METHODS}
+        for name in PROFILED_METHODS:
+            if name not in self.__dict__:
+                setattr(self, name, profiled(getattr(self, name), self._profile[name]))
+
+    def __getstate__(self):
+        """Pickles (and copies) the game without its profiling wrappers, so the copy starts with profiling disabled"""
+        state = self.__dict__.copy()
+        for name in PROFILED_METHODS:
+            state.pop(name, None)
+        return state
+
+    def disable_profiling(self):
+        """Stops counting and timing calls, keeping the stats gathered so far"""
+        for name in PROFILED_METHODS:
+            self.__dict__.pop(name, None)
+
+    def is_profiling(self):
+        """Returns True if profiling is enabled"""
+        return PROFILED_METHODS[0] in self.__dict__
+
+    def get_profile_stats(self):
+        """Returns a snapshot {method name: {'calls': count, 'ns': total nanoseconds}} of the profiled methods"""
+        if self._profile is None:
+            return {}
+        return {name: {'calls': calls, 'ns': nanoseconds} for name, (calls, nanoseconds) in self._profile.items()}
+
+    def reset_profile_stats(self):
+        """Sets every call count and timing back to 0"""
+        if self._profile is not None:
+            for counters in self._profile.values():
+                counters[0] = counters[1] = 0
+
     def resign_game(self):
         """Lets the current player concede the game, giving the other player the win. Updates game_state accordingly."""
         if self._current_player == 'BLACK':
@@ -57,31 +636,63 @@ class GessGame:
         else:
             self._game_state = 'BLACK_WON'
 
-    def make_move(self, center_from, center_to):
+    def make_move(self, center_from, center_to, verbose=True):
         """
         Takes two strings that represent the center square of the piece being moved and the desired new location of
         the center square. Checks if move is illegal and if game has already been won -- if so, returns False. Else,
         makes the move, removes any captured stones, updates game state if necessary, updates whose turn it is, removes
         stones in the gutters, and returns True.
+        An illegal move's reason is printed unless verbose is False; either way get_move_reason returns it.
         """
         center_from = self.convert_center(center_from)                      # convert beginning and ending centers to the list axes of the board (column, row)
         center_to = self.convert_center(center_to)
-        if self.get_game_state() == 'UNFINISHED':                           # if the game is not over
-            if self.is_valid_piece(center_from) is True:                    # and the piece is valid
-                if self.is_valid_move(center_from, center_to) is True:      # and the move is valid
-                    self.move_piece(self._board, center_from, center_to)    # make the move
-                    self.clean_gutters(self._board)                         # clean the gutters
-                    self.check_for_rings(self._board)                       # check for rings
-                    self.check_for_winners()                                # check for winners
-                    self.change_current_player()                            # change current player
-                    return True
-                else:                                                       # move is invalid
-                    return False
-            else:                                                           # piece is invalid
-                return False
-        else:                                                               # game is already over
+        return self.make_move_at(center_from, center_to, verbose)
+
+    def make_move_at(self, center_from, center_to, verbose=True):
+        """Same as make_move, but takes the centers on the board's axes as (column, row) instead of strings"""
+        self._move_reason = self.validate_move(center_from, center_to)
+        if self._move_reason == MoveReason.VALID:
+            self.push_move(center_from, center_to)                          # make the move, clean the gutters, check for rings, winners & change player
+            return True
+        else:
+            if verbose and self._move_reason != MoveReason.GAME_OVER:       # a finished game just refuses quietly
+                print(MOVE_MESSAGES[self._move_reason])
             return False
 
+    def get_move_reason(self):
+        """Returns the MoveReason of the last make_move (MoveReason.VALID if it was made)"""
+        return self._move_reason
+
+    def validate_move(self, center_from, center_to):
+        """
+        Checks a move given as (column, row) centers without making it or printing anything.
+        Returns MoveReason.VALID, or the first reason the move is illegal.
+        """
+        if self.get_game_state() != 'UNFINISHED':                           # game is already over
+            return MoveReason.GAME_OVER
+        reason = self.check_piece(center_from)
+        if reason == MoveReason.VALID:
+            reason = self.check_move(center_from, center_to)
+        return reason
+
+    def push_move(self, center_from, center_to):
+        """
+        Makes an already validated move in place: moves the piece, cleans the gutters, updates the rings, checks for
+        winners and changes the current player. The Position before the move is kept so pop_move can take it back;
+        it shares its immutable masks with the board, so nothing is copied.
+        """
+        zone = ring_zone(center_from) | ring_zone(center_to)
+        self._undo_stack.append(self.get_position())
+        self.move_piece(self._board, center_from, center_to)
+        self.clean_gutters(self._board)
+        self.check_for_rings(self._board, self._rings, zone)                # only rings around the two footprints can change
+        self.check_for_winners()
+        self.change_current_player()
+
+    def pop_move(self):
+        """Takes back the last move made with push_move (or make_move), restoring the game exactly as it was"""
+        self.load_position(self._undo_stack.pop())
+
     def convert_center(self, beg_center):
         """Takes user inputted centers and converts to same axes as board"""
         column_dict = {'a': 0, 'b': 1, 'c': 2, 'd': 3, 'e': 4, 'f': 5, 'g': 6, 'h': 7, 'i': 8, 'j': 9, 'k': 10, 'l': 11,
@@ -92,41 +703,51 @@ class GessGame:
         converted_row = int(beg_center[1:]) - 1
         return converted_column, converted_row
 
+    def convert_to_string(self, center):
+        """Takes a center on the board's axes (column, row) and converts it back to the user's notation, e.g. 'c3'"""
+        return 'abcdefghijklmnopqrst'[center[0]] + str(center[1] + 1)
+
     def get_center(self, board, center):
-        """Returns the value at the center provided"""
-        return board[center[1]][center[0]]
+        """Returns the value ('B', 'W' or ' ') at the center provided"""
+        bit = square_bit(center)
+        if board[0] & bit:
+            return 'B'
+        elif board[1] & bit:
+            return 'W'
+        else:
+            return ' '
 
     def get_north(self, board, center):
         """Returns the value at the space north of the center provided"""
-        return board[center[1] - 1][center[0]]
+        return self.get_center(board, (center[0], center[1] - 1))
 
     def get_south(self, board, center):
         """Returns the value at the space south of the center provided"""
-        return board[center[1] + 1][center[0]]
+        return self.get_center(board, (center[0], center[1] + 1))
 
     def get_northwest(self, board, center):
         """Returns the value at the space northwest of the center provided"""
-        return board[center[1] - 1][center[0] - 1]
+        return self.get_center(board, (center[0] - 1, center[1] - 1))
 
     def get_northeast(self, board, center):
         """Returns the value at the space northeast of the center provided"""
-        return board[center[1] - 1][center[0] + 1]
+        return self.get_center(board, (center[0] + 1, center[1] - 1))
 
     def get_southwest(self, board, center):
         """Returns the value at the space southwest of the center provided"""
-        return board[center[1] + 1][center[0] - 1]
+        return self.get_center(board, (center[0] - 1, center[1] + 1))
 
     def get_southeast(self, board, center):
         """Returns the value at the space southeast of the center provided"""
-        return board[center[1] + 1][center[0] + 1]
+        return self.get_center(board, (center[0] + 1, center[1] + 1))
 
     def get_east(self, board, center):
         """Returns the value at the space east of the center provided"""
-        return board[center[1]][center[0] + 1]
+        return self.get_center(board, (center[0] + 1, center[1]))
 
     def get_west(self, board, center):
         """Returns the value at the space west of the center provided"""
-        return board[center[1]][center[0] - 1]
+        return self.get_center(board, (center[0] - 1, center[1]))
 
     def get_center_location(self, center):
         """Returns the location of the center provided"""
@@ -204,88 +825,58 @@ class GessGame:
         """Gets initial of current player"""
         return self._current_player[0]
 
+    def get_current_player_index(self):
+        """Gets the position of the current player's mask in a board (0 for black, 1 for white)"""
+        return COLOR_INDEX[self.get_current_player_initial()]
+
     def is_valid_piece(self, center_from):
-        """Checks whether piece is valid"""
+        """Checks whether piece is valid, printing the reason if it is not"""
+        reason = self.check_piece(center_from)
+        if reason != MoveReason.VALID:
+            print(MOVE_MESSAGES[reason])
+        return reason == MoveReason.VALID
+
+    def check_piece(self, center_from):
+        """Checks whether piece is valid, returns MoveReason.VALID or the reason it is not"""
         # is the center off the board?
         if self.center_in_gutter(center_from) is True:
-            print("This piece is invalid because its center is on the board's outermost row or column")
-            return False
+            return MoveReason.GUTTER_CENTER
         # do all of the squares surrounding the center contain either the current player's stones or blank squares?
-        else:
-            piece = self.get_piece(self._board, center_from)
-            valid_piece = True
-            elem = self.get_current_player_initial()
-            for e in piece:
-                if e != elem and e != ' ':
-                    valid_piece = False
-                    break
-            if valid_piece is False:
-                print("This piece is invalid because it contains the other player's stones.")
-            return valid_piece
+        opponent_stones = self._board[1 - self.get_current_player_index()]
+        if footprint(center_from) & opponent_stones:
+            return MoveReason.ENEMY_STONE
+        return MoveReason.VALID
 
     def move_piece(self, board, center_from, center_to):
         """Once a move has been approved, this function is called to clear the existing piece and repopulate it at its destination"""
-        temp_center = board[center_from[1]][center_from[0]]
-        temp_north = board[center_from[1] - 1][center_from[0]]
-        temp_south = board[center_from[1] + 1][center_from[0]]
-        temp_northeast = board[center_from[1] - 1][center_from[0] - 1]
-        temp_northwest = board[center_from[1] - 1][center_from[0] + 1]
-        temp_southeast = board[center_from[1] + 1][center_from[0] - 1]
-        temp_southwest = board[center_from[1] + 1][center_from[0] + 1]
-        temp_east = board[center_from[1]][center_from[0] + 1]
-        temp_west = board[center_from[1]][center_from[0] - 1]
-        # clear old
-        board[center_from[1]][center_from[0]] = ' '
-        board[center_from[1] - 1][center_from[0]] = ' '
-        board[center_from[1] + 1][center_from[0]] = ' '
-        board[center_from[1] - 1][center_from[0] - 1] = ' '
-        board[center_from[1] - 1][center_from[0] + 1] = ' '
-        board[center_from[1] + 1][center_from[0] - 1] = ' '
-        board[center_from[1] + 1][center_from[0] + 1] = ' '
-        board[center_from[1]][center_from[0] + 1] = ' '
-        board[center_from[1]][center_from[0] - 1] = ' '
-        # populate new
-        board[center_to[1]][center_to[0]] = temp_center
-        board[center_to[1] - 1][center_to[0]] = temp_north
-        board[center_to[1] + 1][center_to[0]] = temp_south
-        board[center_to[1] - 1][center_to[0] - 1] = temp_northeast
-        board[center_to[1] - 1][center_to[0] + 1] = temp_northwest
-        board[center_to[1] + 1][center_to[0] - 1] = temp_southeast
-        board[center_to[1] + 1][center_to[0] + 1] = temp_southwest
-        board[center_to[1]][center_to[0] + 1] = temp_east
-        board[center_to[1]][center_to[0] - 1] = temp_west
+        source = footprint(center_from)
+        destination = footprint(center_to)
+        offset = (center_to[1] - center_from[1]) * BOARD_SIZE + center_to[0] - center_from[0]
+        for color in (0, 1):
+            piece = shift(board[color] & source, offset)                           # lift the piece and slide it to its destination
+            moved = board[color] & ~source & ~destination | piece                  # clear old, capture under the footprint, populate new
+            self._hash ^= hash_squares(color, board[color] ^ moved)                # only the squares that changed
+            board[color] = moved
 
     def clean_gutters(self, board):
         """At the end of a successful move, eliminates the stones that have landed in the board's outside rows"""
-        board[0] = [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ']
-        board[19] = [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ']
-        for i in range(1, 18):
-            board[i][0] = ' '
-            board[i][19] = ' '
-
-    def check_for_rings(self, board):
-        """
-        Checks whether a player has any rings, returns True or False accordingly.
-        For use in checking for winners and checking whether a move is valid.
-        """
-        self._black_rings = 0                                   # resetting/initializing ring counts
-        self._white_rings = 0
-        for row in range(1, 19):                                # for every center between row 1 & 19 and column 1 & 19
-            for column in range(1, 19):
-                center = row, column
-                if self.get_center(board, center) == ' ':       # a ring is only a ring if it has no center
-                    ring = self.get_piece(board, center)[1:]    # get a list of the elements in the ring surrounding the center (excluding center)
-                    ring_found = True
-                    elem = ring[0]
-                    for e in ring:
-                        if e != elem or e == ' ':               # if an element in the ring is different from the first or blank, set ring_found to False
-                            ring_found = False
-                            break
-                    if ring_found is True:                      # if there is a ring, increment the appropriate player's ring count
-                        if elem == "B":
-                            self._black_rings += 1
-                        if elem == "W":
-                            self._white_rings += 1
+        for color in (0, 1):
+            self._hash ^= hash_squares(color, board[color] & ~INTERIOR_MASK)
+            board[color] &= INTERIOR_MASK
+
+    def check_for_rings(self, board, rings=None, centers=INTERIOR_MASK):
+        """
+        Re-examines the centers provided (every center by default), stores the ring centers found in rings
+        ([black, white] masks, new ones by default) and stores the ring counts in self._black_rings and
+        self._white_rings. For use in checking for winners and checking whether a move is valid.
+        """
+        if rings is None:
+            rings = [0, 0]
+        empty = ~(board[0] | board[1])                                      # a ring is only a ring if it has no center
+        for color in (0, 1):
+            rings[color] = rings[color] & ~centers | find_rings(board[color], empty, centers)
+        self._black_rings = count_bits(rings[0])
+        self._white_rings = count_bits(rings[1])
 
     def check_for_winners(self):
         """
@@ -299,17 +890,7 @@ class GessGame:
 
     def check_for_eliminating_own_ring(self, center_from, center_to):
         """Checks whether the player's move eliminates their last ring"""
-        self._temp_board = []                                           # initialize a temporary board for testing the move
-        for i in self._board:
-            self._temp_board.append(list(i))
-        self.move_piece(self._temp_board, center_from, center_to)       # make the move on the temporary board
-        self.check_for_rings(self._temp_board)                          # check how the move impacts rings
-        if self._black_rings == 0 and self._current_player == 'BLACK':  # check whether the current player is eliminating all of their own rings
-            return True
-        elif self._white_rings == 0 and self._current_player == 'WHITE':
-            return True
-        else:
-            return False
+        return self.loses_last_ring(self.get_current_player_index(), center_from, center_to)
 
     def change_current_player(self):
         """Updates the current player (to be called at the end of a valid move)"""
@@ -317,12 +898,13 @@ class GessGame:
             self._current_player = 'WHITE'
         else:
             self._current_player = 'BLACK'
+        self._hash ^= ZOBRIST_WHITE_TO_MOVE
 
     def unlimited_distance(self, center_from):
         """Checks whether a piece has a center, and is thus able to move an unlimited distance if unobstructed"""
-        if self.get_center(self._board, center_from) == self.get_current_player_initial():  # has center
+        if self._board[self.get_current_player_index()] & square_bit(center_from):     # has center
             return True
-        else:                                                                               # has no center
+        else:                                                                           # has no center
             return False
 
     def violating_distance(self, center_from, center_to):
@@ -341,212 +923,111 @@ class GessGame:
 
     def violating_direction(self, center_from, center_to):
         """Checks whether the proposed move is in a direction it is allowed to move"""
-        board = self._board
-        populated_direction = self.get_current_player_initial()
         proposed_row_change = center_to[1] - center_from[1]
         proposed_column_change = center_to[0] - center_from[0]
-        forty_five_degrees = False                              # validate that any angled move has a slope of 1
-        if proposed_column_change != 0:                         # to avoid zero division error
-            forty_five_degrees = abs(proposed_row_change / proposed_column_change) == 1
-        if proposed_row_change < 0 and proposed_column_change == 0 and self.get_north(board, center_from) == populated_direction:
-            self._move_direction = 'north'
-            return False
-        elif proposed_row_change > 0 and proposed_column_change == 0 and self.get_south(board, center_from) == populated_direction:
-            self._move_direction = 'south'
-            return False
-        elif proposed_column_change < 0 and proposed_row_change == 0 and self.get_west(board, center_from) == populated_direction:
-            self._move_direction = 'west'
-            return False
-        elif proposed_column_change > 0 and proposed_row_change == 0 and self.get_east(board, center_from) == populated_direction:
-            self._move_direction = 'east'
-            return False
-        elif proposed_row_change < 0 and proposed_column_change < 0 and forty_five_degrees and self.get_northwest(board, center_from) == populated_direction:
-            self._move_direction = 'northwest'
-            return False
-        elif proposed_row_change < 0 and proposed_column_change > 0 and forty_five_degrees and self.get_northeast(board, center_from) == populated_direction:
-            self._move_direction = 'northeast'
-            return False
-        elif proposed_row_change > 0 and proposed_column_change < 0 and forty_five_degrees and self.get_southwest(board, center_from) == populated_direction:
-            self._move_direction = 'southwest'
-            return False
-        elif proposed_row_change > 0 and proposed_column_change > 0 and forty_five_degrees and self.get_southeast(board, center_from) == populated_direction:
-            self._move_direction = 'southeast'
+        if proposed_row_change == 0 and proposed_column_change == 0:    # not a move at all
+            return True
+        if proposed_row_change != 0 and proposed_column_change != 0 and abs(proposed_row_change) != abs(proposed_column_change):
+            return True                                                 # any angled move must have a slope of 1
+        step = ((proposed_column_change > 0) - (proposed_column_change < 0), (proposed_row_change > 0) - (proposed_row_change < 0))
+        for direction, delta in DIRECTIONS.items():
+            if delta == step:
+                break
+        # the piece may only move toward a square of its footprint that holds one of the player's stones
+        populated_direction = RAYS[square_index(center_from)][direction][0]
+        if self._board[self.get_current_player_index()] & populated_direction:
+            self._move_direction = direction
             return False
-        else:                                                   # the move is in an disallowed direction
+        else:                                                           # the move is in an disallowed direction
             return True
 
     def center_in_gutter(self, center):
-        """Checks whether the proposed center is in an disallowed location"""
-        if center[1] == 0 or center[1] == 19 or center[0] == 0 or center[0] == 19:
+        """Checks whether the proposed center is in an disallowed location (the gutter, or off the board entirely)"""
+        if not 0 < center[0] < BOARD_SIZE - 1 or not 0 < center[1] < BOARD_SIZE - 1:
             return True
         else:
             return False
 
     def is_blocked(self, center_from, center_to):
-        """Checks whether move is blocked by stones, returns True or False accordingly"""
-        # find the number of rows and columns the piece is expected to move
-        proposed_row_change = center_to[1] - center_from[1]
-        proposed_column_change = center_to[0] - center_from[0]
-
-        if self._move_direction == 'south':
-            center = center_from                            # while we still have rows to check, start with original center
-            while proposed_row_change > 1:
-                potential_blockages = self.get_south_row(self._board, self.get_south_location(center))
-                center = self.get_south_location(center)    # set the center one row further south
-                proposed_row_change -= 1                    # decrement the rows to check
-                for element in potential_blockages:         # if the row south of the current south square of the piece is not blank, return True
-                    if element != ' ':
-                        return True
-            else:                                           # if we made it down to only 1 remaining row/col of movement, the piece was not blocked
-                return False
-
-        elif self._move_direction == 'north':
-            proposed_row_change = proposed_row_change * - 1
-            center = center_from
-            while proposed_row_change > 1:
-                potential_blockages = self.get_north_row(self._board, self.get_north_location(center))
-                center = self.get_north_location(center)
-                proposed_row_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            else:
-                return False
-
-        elif self._move_direction == 'east':
-            center = center_from
-            while proposed_column_change > 1:
-                potential_blockages = self.get_east_row(self._board, self.get_east_location(center))
-                center = self.get_east_location(center)
-                proposed_column_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            else:
-                return False
-
-        elif self._move_direction == 'west':
-            proposed_column_change = proposed_column_change * - 1
-            center = center_from
-            while proposed_column_change > 1:
-                potential_blockages = self.get_west_row(self._board, self.get_west_location(center))
-                center = self.get_west_location(center)
-                proposed_column_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            else:
-                return False
-
-        elif self._move_direction == 'northwest':
-            # north function + west function but replaced direction we're traveling with northwest
-            proposed_row_change = proposed_row_change * - 1
-            center = center_from
-            while proposed_row_change > 1:
-                potential_blockages = self.get_north_row(self._board, self.get_north_location(center))
-                center = self.get_northwest_location(center)
-                proposed_row_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            proposed_column_change = proposed_column_change * - 1
-            center = center_from
-            while proposed_column_change > 1:
-                potential_blockages = self.get_west_row(self._board, self.get_west_location(center))
-                center = self.get_northwest_location(center)
-                proposed_column_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            else:
-                return False
-
-        elif self._move_direction == 'northeast':
-            # north function + east function but replaced direction we're traveling with northeast
-            proposed_row_change = proposed_row_change * - 1
-            center = center_from
-            while proposed_row_change > 1:
-                potential_blockages = self.get_north_row(self._board, self.get_north_location(center))
-                center = self.get_northeast_location(center)
-                proposed_row_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            center = center_from
-            while proposed_column_change > 1:
-                potential_blockages = self.get_east_row(self._board, self.get_east_location(center))
-                center = self.get_northeast_location(center)
-                proposed_column_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            else:
-                return False
-
-        elif self._move_direction == 'southwest':
-            # south function + west function but replaced direction we're traveling with southwest
-            center = center_from
-            while proposed_row_change > 1:
-                potential_blockages = self.get_south_row(self._board, self.get_south_location(center))
-                center = self.get_southwest_location(center)
-                proposed_row_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            proposed_column_change = proposed_column_change * - 1
-            center = center_from
-            while proposed_column_change > 1:
-                potential_blockages = self.get_west_row(self._board, self.get_west_location(center))
-                center = self.get_southwest_location(center)
-                proposed_column_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            else:
-                return False
-
-        elif self._move_direction == 'southeast':
-            # south function + east function but replaced direction we're traveling with southeast
-            center = center_from
-            while proposed_row_change > 1:
-                potential_blockages = self.get_south_row(self._board, self.get_south_location(center))
-                center = self.get_southeast_location(center)
-                proposed_row_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            center = center_from
-            while proposed_column_change > 1:
-                potential_blockages = self.get_east_row(self._board, self.get_east_location(center))
-                center = self.get_southeast_location(center)
-                proposed_column_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            else:
-                return False
+        """
+        Checks whether move is blocked by stones, returns True or False accordingly.
+        A piece stops as soon as its footprint overlaps any stone, so every footprint the piece passes through on its
+        way to center_to (excluding its own starting footprint) must be empty.
+        """
+        distance = max(abs(center_to[0] - center_from[0]), abs(center_to[1] - center_from[1]))
+        if distance == 1:                                               # the destination itself may hold stones (captures)
+            return False
+        steps = RAYS[square_index(center_from)][self._move_direction][1]
+        swept = steps[distance - 2][2]                                  # everything covered on the way to the last step
+        if swept & (self._board[0] | self._board[1]):
+            return True
+        else:
+            return False
 
     def is_valid_move(self, center_from, center_to):
-        """Checks whether move is valid, returns True or False accordingly"""
+        """Checks whether move is valid, returns True or False accordingly (printing the reason if it is not)"""
+        reason = self.check_move(center_from, center_to)
+        if reason != MoveReason.VALID:
+            print(MOVE_MESSAGES[reason])
+        return reason == MoveReason.VALID
+
+    def check_move(self, center_from, center_to):
+        """Checks whether the move of a valid piece is valid, returns MoveReason.VALID or the reason it is not"""
 
         if self.center_in_gutter(center_to) is False:                                           # move does not move the center off the board
             if self.violating_direction(center_from, center_to) is False:                       # direction limit is not violated
                 if self.violating_distance(center_from, center_to) is False:                    # distance limit is not violated
                     if self.is_blocked(center_from, center_to) is False:                        # there are no stones in the way
                         if self.check_for_eliminating_own_ring(center_from, center_to) is True:
-                            print("This move is invalid because it eliminates the current player's last ring")
-                            return False
+                            return MoveReason.SELF_RING_LOSS
                         else:                                                                   # move does not eliminate player's own last ring
-                            return True
+                            return MoveReason.VALID
                     else:
-                        print("This move is invalid because there are stones in the way.")
-                        return False
+                        return MoveReason.BLOCKED
                 else:                                                                           # distance is violated
-                    print("This move is invalid because it is further than the current piece is permitted to move")
-                    return False
+                    return MoveReason.TOO_FAR
             else:                                                                               # direction is violated
-                print("This move is invalid because it is in a direction that is not allowed for the chosen piece.")
-                return False
+                return MoveReason.BAD_DIRECTION
         else:                                                                                   # proposed center is in the gutter
-            print("This move is invalid because the proposed center is in the board's outermost row or column.")
+            return MoveReason.GUTTER_DESTINATION
+
+    def loses_last_ring(self, color, center_from, center_to):
+        """Checks whether moving the piece at center_from to center_to leaves color (0 black, 1 white) without a ring"""
+        zone = ring_zone(center_from) | ring_zone(center_to)
+        if self._rings[color] & ~zone:                                  # a ring away from the move survives it
             return False
+        self.push_move(center_from, center_to)                          # try the move in place, then take it back
+        ring_lost = self._rings[color] == 0
+        self.pop_move()
+        return ring_lost
+
+    def legal_moves(self, player=None, allow_ring_loss=False):
+        """
+        Yields every legal move for player ('BLACK' or 'WHITE', the current player by default) as a pair of
+        (column, row) centers. Each piece walks outward in every direction it may move and stops at the first
+        footprint that overlaps a stone or at the gutter, so destinations past a blockage are never tried.
+        Moves that leave the player without a ring are skipped unless allow_ring_loss is True.
+        """
+        if self._game_state != 'UNFINISHED':                            # nobody moves once the game is over
+            return
+        if player is None:
+            player = self._current_player
+        color = COLOR_INDEX[player[0]]
+        own_stones = self._board[color]
+        opponent_stones = self._board[1 - color]
+        occupied = own_stones | opponent_stones
+        for index, center_from in CENTERS:
+            piece = FOOTPRINTS[index]
+            if piece & opponent_stones or not own_stones & piece & ~(1 << index):
+                continue                                                # invalid piece, or no stone to point a direction
+            has_center = own_stones >> index & 1                        # a center stone means unlimited distance
+            for pointer, steps in RAYS[index].values():
+                if not own_stones & pointer:
+                    continue                                            # direction not allowed for this piece
+                if not has_center:
+                    steps = steps[:3]
+                for center_to, edge, swept in steps:                    # the steps end at the gutter
+                    if allow_ring_loss or not self.loses_last_ring(color, center_from, center_to):
+                        yield center_from, center_to
+                    if edge & occupied:                                 # the piece cannot travel past stones
+                        break
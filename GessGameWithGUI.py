@@ -1,747 +1,259 @@
-import sys
+# Description: pygame front end for GessGame -- a window to play in, or off-screen rendering of positions to images
+
+import argparse
+import io
+import os
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')   # keep importing this module quiet
 import pygame
-from pygame.locals import *
 
+from GessGame import GessGame, BOARD_SIZE, MOVE_MESSAGES
+
+SCREEN_SIZE = (600, 600)
+SQUARE_SIZE = 25                    # pixels per square
+RADIUS = 12.5                       # of a stone
+INDENT = SQUARE_SIZE * 2            # pixels between the edge of the screen and the board
+DARK = (50, 50, 50)                 # black stones, grid and text
+LIGHT = (250, 250, 250)             # white stones
+PLAYER_RECT = pygame.Rect(12, 12, 27, 27)          # marker of the player whose turn it is
+NOTIFICATION_RECT = pygame.Rect(0, INDENT + 20 * SQUARE_SIZE + 2, 600, 600 - INDENT - 20 * SQUARE_SIZE - 2)
+BACKGROUND_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'background.png')
 
-class GessGame:
+
+class GessGameWithGUI(GessGame):
     """
-    Represents a Gess Game.
-    Each game is initialized with the same board, (in state unfinished), and starts with current player = black.
+    Represents a Gess game drawn with pygame.
+    Nothing is initialized until it is needed: render() and render_png() draw onto an off-screen surface and need
+    no display, while run() opens a window and plays the game in it. To render many positions, reuse one instance
+    and call set_position for each.
     """
 
-    def __init__(self):
-        """Initializes members of class GessGame"""
-        self._game_state = 'UNFINISHED'             # 'UNFINISHED', 'BLACK_WON' or 'WHITE_WON'
-        self._current_player = 'BLACK'              # 'BLACK' or 'WHITE' (black goes first)
-        self._black_rings = 0                       # number of rings player has (should never be called without first calling check_for_rings)
-        self._white_rings = 0
-        self._temp_board = []                       # temporary board used for testing move legality
-        self._move_direction = ''                   # player's current move direction (only if valid)
+    def __init__(self, book=None):
+        """Initializes members of class GessGameWithGUI, with an optional GessBook.OpeningBook to suggest moves"""
+        super().__init__()
+        self._book = book
         self._notification = ''                     # notification to display for player
-        self._board = [ # A    B    C    D    E    F    G    H    I    J    K    L    M    N    O    P    Q    R    S    T
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #1
-                        [' ', ' ', 'B', ' ', 'B', ' ', 'B', 'B', 'B', 'B', 'B', 'B', 'B', 'B', ' ', 'B', ' ', 'B', ' ', ' '], #2
-                        [' ', 'B', 'B', 'B', ' ', 'B', ' ', 'B', 'B', 'B', 'B', ' ', 'B', ' ', 'B', ' ', 'B', 'B', 'B', ' '], #3
-                        [' ', ' ', 'B', ' ', 'B', ' ', 'B', 'B', 'B', 'B', 'B', 'B', 'B', 'B', ' ', 'B', ' ', 'B', ' ', ' '], #4
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #5
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #6
-                        [' ', ' ', 'B', ' ', ' ', 'B', ' ', ' ', 'B', ' ', ' ', 'B', ' ', ' ', 'B', ' ', ' ', 'B', ' ', ' '], #7
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #8
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #9
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #10
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #11
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #12
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #13
-                        [' ', ' ', 'W', ' ', ' ', 'W', ' ', ' ', 'W', ' ', ' ', 'W', ' ', ' ', 'W', ' ', ' ', 'W', ' ', ' '], #14
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #15
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #16
-                        [' ', ' ', 'W', ' ', 'W', ' ', 'W', 'W', 'W', 'W', 'W', 'W', 'W', 'W', ' ', 'W', ' ', 'W', ' ', ' '], #17
-                        [' ', 'W', 'W', 'W', ' ', 'W', ' ', 'W', 'W', 'W', 'W', ' ', 'W', ' ', 'W', ' ', 'W', 'W', 'W', ' '], #18
-                        [' ', ' ', 'W', ' ', 'W', ' ', 'W', 'W', 'W', 'W', 'W', 'W', 'W', 'W', ' ', 'W', ' ', 'W', ' ', ' '], #19
-                        [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' '], #20
-                        ]
-
-    def get_board(self):
-        """Prints board"""
-        print("  A    B    C    D    E    F    G    H    I    J    K    L    M    N    O    P    Q    R    S    T")
-        for row in self._board:
-            print(row)
-
-    def get_game_state(self):
-        """Returns the state of the game"""
-        return self._game_state
+        self._surface = None                        # window or off-screen surface the board is drawn on
+        self._window = False                        # True once run() has opened a window
+        self._static = None                         # background, grid and axis labels, drawn once
+        self._notification_font = None
+        self._drawn = None                          # (black, white, current player, notification) last drawn
+        self._selected = None                       # center picked by the first click of a move
 
     def set_notification(self, message):
         """Sets the notification message"""
         self._notification = message
 
-    def resign_game(self):
-        """Lets the current player concede the game, giving the other player the win. Updates game_state accordingly."""
-        if self._current_player == 'BLACK':
-            self._game_state = 'WHITE_WON'
-        else:
-            self._game_state = 'BLACK_WON'
-
-    def make_move(self, center_from, center_to):
-        """
-        Takes two strings that represent the center square of the piece being moved and the desired new location of
-        the center square. Checks if move is illegal and if game has already been won -- if so, returns False. Else,
-        makes the move, removes any captured stones, updates game state if necessary, updates whose turn it is, removes
-        stones in the gutters, and returns True.
-        """
-        center_from = self.convert_center(center_from)                      # convert beginning and ending centers to the list axes of the board (column, row)
-        center_to = self.convert_center(center_to)
-        if self.get_game_state() == 'UNFINISHED':                           # if the game is not over
-            if self.is_valid_piece(center_from) is True:                    # and the piece is valid
-                if self.is_valid_move(center_from, center_to) is True:      # and the move is valid
-                    self.move_piece(self._board, center_from, center_to)    # make the move
-                    self.clean_gutters(self._board)                         # clean the gutters
-                    self.check_for_rings(self._board)                       # check for rings
-                    self.check_for_winners()                                # check for winners
-                    if self._game_state != 'UNFINISHED':
-                        self._notification = self._game_state
-                        self.draw_board()
-                    self.change_current_player()                            # change current player
-                    return True
-                else:                                                       # move is invalid
-                    return False
-            else:                                                           # piece is invalid
-                return False
-        else:                                                               # game is already over
-            return False
-
-    def convert_center(self, beg_center):
-        """Takes user inputted centers and converts to same axes as board"""
-        column_dict = {'a': 0, 'b': 1, 'c': 2, 'd': 3, 'e': 4, 'f': 5, 'g': 6, 'h': 7, 'i': 8, 'j': 9, 'k': 10, 'l': 11,
-                       'm': 12, 'n': 13, 'o': 14, 'p': 15, 'q': 16, 'r': 17, 's': 18, 't': 19}
-        # convert from letter supplied to corresponding list column
-        converted_column = column_dict[beg_center[0]]
-        # convert from number supplied to corresponding list row
-        converted_row = int(beg_center[1:]) - 1
-        return converted_column, converted_row
-
-    def get_center(self, board, center):
-        """Returns the value at the center provided"""
-        return board[center[1]][center[0]]
-
-    def get_north(self, board, center):
-        """Returns the value at the space north of the center provided"""
-        return board[center[1] - 1][center[0]]
-
-    def get_south(self, board, center):
-        """Returns the value at the space south of the center provided"""
-        return board[center[1] + 1][center[0]]
-
-    def get_northwest(self, board, center):
-        """Returns the value at the space northwest of the center provided"""
-        return board[center[1] - 1][center[0] - 1]
-
-    def get_northeast(self, board, center):
-        """Returns the value at the space northeast of the center provided"""
-        return board[center[1] - 1][center[0] + 1]
-
-    def get_southwest(self, board, center):
-        """Returns the value at the space southwest of the center provided"""
-        return board[center[1] + 1][center[0] - 1]
-
-    def get_southeast(self, board, center):
-        """Returns the value at the space southeast of the center provided"""
-        return board[center[1] + 1][center[0] + 1]
-
-    def get_east(self, board, center):
-        """Returns the value at the space east of the center provided"""
-        return board[center[1]][center[0] + 1]
-
-    def get_west(self, board, center):
-        """Returns the value at the space west of the center provided"""
-        return board[center[1]][center[0] - 1]
+    def get_notification(self):
+        """Returns the notification message"""
+        return self._notification
 
-    def get_center_location(self, center):
-        """Returns the location of the center provided"""
-        return center[0], center[1]
+    def make_move(self, center_from, center_to, verbose=False):
+        """Same as GessGame.make_move, but quiet by default: see make_move_at"""
+        return super().make_move(center_from, center_to, verbose)
 
-    def get_north_location(self, center):
-        """Returns the location of the space north of the center provided"""
-        return center[0], center[1] - 1
+    def make_move_at(self, center_from, center_to, verbose=False):
+        """Same as GessGame.make_move_at, but puts why a move was refused (or the winner) in the notification"""
+        made = super().make_move_at(center_from, center_to, verbose)
+        if not made:
+            self._notification = MOVE_MESSAGES[self.get_move_reason()]
+        elif self.get_game_state() != 'UNFINISHED':
+            self._notification = self.get_game_state()
+        return made
 
-    def get_south_location(self, center):
-        """Returns the location of the space south of the center provided"""
-        return center[0], center[1] + 1
-
-    def get_east_location(self, center):
-        """Returns the location of the space east of the center provided"""
-        return center[0] + 1, center[1]
-
-    def get_west_location(self, center):
-        """Returns the location of the space west of the center provided"""
-        return center[0] - 1, center[1]
-
-    def get_northwest_location(self, center):
-        """Returns the location of the space northwest of the center provided"""
-        return center[0] - 1, center[1] - 1
-
-    def get_northeast_location(self, center):
-        """Returns the location of the space northeast of the center provided"""
-        return center[0] + 1, center[1] - 1
-
-    def get_southwest_location(self, center):
-        """Returns the location of the space southwest of the center provided"""
-        return center[0] - 1, center[1] + 1
-
-    def get_southeast_location(self, center):
-        """Returns the location of the space southeast of the center provided"""
-        return center[0] + 1, center[1] + 1
-
-    def get_piece(self, board, center):
-        """Returns the values of the piece using the center provided"""
-        return [self.get_center(board, center),
-                self.get_north(board, center),
-                self.get_south(board, center),
-                self.get_northeast(board, center),
-                self.get_northwest(board, center),
-                self.get_southeast(board, center),
-                self.get_southwest(board, center),
-                self.get_east(board, center),
-                self.get_west(board, center)]
-
-    def get_north_row(self, board, center):
-        """Returns the values of the piece's north row using the center provided"""
-        return [self.get_north(board, center),
-                self.get_northeast(board, center),
-                self.get_northwest(board, center)]
-
-    def get_south_row(self, board, center):
-        """Returns the values of the piece's south row using the center provided"""
-        return [self.get_south(board, center),
-                self.get_southeast(board, center),
-                self.get_southwest(board, center)]
-
-    def get_east_row(self, board, center):
-        """Returns the values of the piece's east row using the center provided"""
-        return [self.get_northeast(board, center),
-                self.get_southeast(board, center),
-                self.get_east(board, center)]
-
-    def get_west_row(self, board, center):
-        """Returns the values of the piece's west row using the center provided"""
-        return [self.get_northwest(board, center),
-                self.get_southwest(board, center),
-                self.get_west(board, center)]
-
-    def get_current_player_initial(self):
-        """Gets initial of current player"""
-        return self._current_player[0]
-
-    def is_valid_piece(self, center_from):
-        """Checks whether piece is valid"""
-        # is the center off the board?
-        if self.center_in_gutter(center_from) is True:
-            self._notification = "This piece is invalid because its center is on the board's outermost row or column"
-            return False
-        # do all of the squares surrounding the center contain either the current player's stones or blank squares?
-        else:
-            piece = self.get_piece(self._board, center_from)
-            valid_piece = True
-            elem = self.get_current_player_initial()
-            for e in piece:
-                if e != elem and e != ' ':
-                    valid_piece = False
-                    break
-            if valid_piece is False:
-                self._notification = "This piece is invalid because it contains the other player's stones."
-            return valid_piece
-
-    def move_piece(self, board, center_from, center_to):
-        """Once a move has been approved, this function is called to clear the existing piece and repopulate it at its destination"""
-        temp_center = board[center_from[1]][center_from[0]]
-        temp_north = board[center_from[1] - 1][center_from[0]]
-        temp_south = board[center_from[1] + 1][center_from[0]]
-        temp_northeast = board[center_from[1] - 1][center_from[0] - 1]
-        temp_northwest = board[center_from[1] - 1][center_from[0] + 1]
-        temp_southeast = board[center_from[1] + 1][center_from[0] - 1]
-        temp_southwest = board[center_from[1] + 1][center_from[0] + 1]
-        temp_east = board[center_from[1]][center_from[0] + 1]
-        temp_west = board[center_from[1]][center_from[0] - 1]
-        # clear old
-        board[center_from[1]][center_from[0]] = ' '
-        board[center_from[1] - 1][center_from[0]] = ' '
-        board[center_from[1] + 1][center_from[0]] = ' '
-        board[center_from[1] - 1][center_from[0] - 1] = ' '
-        board[center_from[1] - 1][center_from[0] + 1] = ' '
-        board[center_from[1] + 1][center_from[0] - 1] = ' '
-        board[center_from[1] + 1][center_from[0] + 1] = ' '
-        board[center_from[1]][center_from[0] + 1] = ' '
-        board[center_from[1]][center_from[0] - 1] = ' '
-        # populate new
-        board[center_to[1]][center_to[0]] = temp_center
-        board[center_to[1] - 1][center_to[0]] = temp_north
-        board[center_to[1] + 1][center_to[0]] = temp_south
-        board[center_to[1] - 1][center_to[0] - 1] = temp_northeast
-        board[center_to[1] - 1][center_to[0] + 1] = temp_northwest
-        board[center_to[1] + 1][center_to[0] - 1] = temp_southeast
-        board[center_to[1] + 1][center_to[0] + 1] = temp_southwest
-        board[center_to[1]][center_to[0] + 1] = temp_east
-        board[center_to[1]][center_to[0] - 1] = temp_west
-
-    def clean_gutters(self, board):
-        """At the end of a successful move, eliminates the stones that have landed in the board's outside rows"""
-        board[0] = [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ']
-        board[19] = [' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ']
-        for i in range(1, 18):
-            board[i][0] = ' '
-            board[i][19] = ' '
-
-    def check_for_rings(self, board):
-        """
-        Checks whether a player has any rings, returns True or False accordingly.
-        For use in checking for winners and checking whether a move is valid.
+    def clone(self):
         """
-        self._black_rings = 0                                   # resetting/initializing ring counts
-        self._white_rings = 0
-        for row in range(1, 19):                                # for every center between row 1 & 19 and column 1 & 19
-            for column in range(1, 19):
-                center = row, column
-                if self.get_center(board, center) == ' ':       # a ring is only a ring if it has no center
-                    ring = self.get_piece(board, center)[1:]    # get a list of the elements in the ring surrounding the center (excluding center)
-                    ring_found = True
-                    elem = ring[0]
-                    for e in ring:
-                        if e != elem or e == ' ':               # if an element in the ring is different from the first or blank, set ring_found to False
-                            ring_found = False
-                            break
-                    if ring_found is True:                      # if there is a ring, increment the appropriate player's ring count
-                        if elem == "B":
-                            self._black_rings += 1
-                        if elem == "W":
-                            self._white_rings += 1
-
-    def check_for_winners(self):
+        Same as GessGame.clone, but the copy draws on its own off-screen surface from scratch and has no piece
+        selected. Only the pre-rendered background and fonts, which are never drawn on, are shared.
         """
-        Checks whether anyone has won -- if so, updates self._game_state.
-        This should only be called immediately after check_for_rings.
-        """
-        if self._black_rings == 0:
-            self._game_state = 'WHITE_WON'
-        if self._white_rings == 0:
-            self._game_state = 'BLACK_WON'
-
-    def check_for_eliminating_own_ring(self, center_from, center_to):
-        """Checks whether the player's move eliminates their last ring"""
-        self._temp_board = []                                           # initialize a temporary board for testing the move
-        for i in self._board:
-            self._temp_board.append(list(i))
-        self.move_piece(self._temp_board, center_from, center_to)       # make the move on the temporary board
-        self.check_for_rings(self._temp_board)                          # check how the move impacts rings
-        if self._black_rings == 0 and self._current_player == 'BLACK':  # check whether the current player is eliminating all of their own rings
-            return True
-        elif self._white_rings == 0 and self._current_player == 'WHITE':
-            return True
-        else:
-            return False
-
-    def change_current_player(self):
-        """Updates the current player (to be called at the end of a valid move)"""
-        if self._current_player == 'BLACK':
-            self._current_player = 'WHITE'
-        else:
-            self._current_player = 'BLACK'
-
-    def unlimited_distance(self, center_from):
-        """Checks whether a piece has a center, and is thus able to move an unlimited distance if unobstructed"""
-        if self.get_center(self._board, center_from) == self.get_current_player_initial():  # has center
-            return True
-        else:                                                                               # has no center
-            return False
-
-    def violating_distance(self, center_from, center_to):
-        """Checks whether the proposed move is further than it is allowed to move"""
-        # If there is a stone in the center, the piece can move any unobstructed distance.
-        if self.unlimited_distance(center_from) is True:                # distance cannot be violated
-            return False
-        # If the center is empty, the piece can move up to three squares.
-        else:
-            vertical_movement = abs(center_to[1] - center_from[1])
-            horizontal_movement = abs(center_to[0] - center_from[0])
-            if vertical_movement > 3 or horizontal_movement > 3:        # distance is violated
-                return True
-            else:                                                       # piece has limited distance, but it is not violated
-                return False
-
-    def violating_direction(self, center_from, center_to):
-        """Checks whether the proposed move is in a direction it is allowed to move"""
-        board = self._board
-        populated_direction = self.get_current_player_initial()
-        proposed_row_change = center_to[1] - center_from[1]
-        proposed_column_change = center_to[0] - center_from[0]
-        forty_five_degrees = False                              # validate that any angled move has a slope of 1
-        if proposed_column_change != 0:                         # to avoid zero division error
-            forty_five_degrees = abs(proposed_row_change / proposed_column_change) == 1
-        if proposed_row_change < 0 and proposed_column_change == 0 and self.get_north(board, center_from) == populated_direction:
-            self._move_direction = 'north'
-            return False
-        elif proposed_row_change > 0 and proposed_column_change == 0 and self.get_south(board, center_from) == populated_direction:
-            self._move_direction = 'south'
-            return False
-        elif proposed_column_change < 0 and proposed_row_change == 0 and self.get_west(board, center_from) == populated_direction:
-            self._move_direction = 'west'
-            return False
-        elif proposed_column_change > 0 and proposed_row_change == 0 and self.get_east(board, center_from) == populated_direction:
-            self._move_direction = 'east'
-            return False
-        elif proposed_row_change < 0 and proposed_column_change < 0 and forty_five_degrees and self.get_northwest(board, center_from) == populated_direction:
-            self._move_direction = 'northwest'
-            return False
-        elif proposed_row_change < 0 and proposed_column_change > 0 and forty_five_degrees and self.get_northeast(board, center_from) == populated_direction:
-            self._move_direction = 'northeast'
-            return False
-        elif proposed_row_change > 0 and proposed_column_change < 0 and forty_five_degrees and self.get_southwest(board, center_from) == populated_direction:
-            self._move_direction = 'southwest'
-            return False
-        elif proposed_row_change > 0 and proposed_column_change > 0 and forty_five_degrees and self.get_southeast(board, center_from) == populated_direction:
-            self._move_direction = 'southeast'
-            return False
-        else:                                                   # the move is in an disallowed direction
-            return True
-
-    def center_in_gutter(self, center):
-        """Checks whether the proposed center is in an disallowed location"""
-        if center[1] == 0 or center[1] == 19 or center[0] == 0 or center[0] == 19:
-            return True
-        else:
-            return False
-
-    def is_blocked(self, center_from, center_to):
-        """Checks whether move is blocked by stones, returns True or False accordingly"""
-        # find the number of rows and columns the piece is expected to move
-        proposed_row_change = center_to[1] - center_from[1]
-        proposed_column_change = center_to[0] - center_from[0]
-
-        if self._move_direction == 'south':
-            center = center_from                            # while we still have rows to check, start with original center
-            while proposed_row_change > 1:
-                potential_blockages = self.get_south_row(self._board, self.get_south_location(center))
-                center = self.get_south_location(center)    # set the center one row further south
-                proposed_row_change -= 1                    # decrement the rows to check
-                for element in potential_blockages:         # if the row south of the current south square of the piece is not blank, return True
-                    if element != ' ':
-                        return True
-            else:                                           # if we made it down to only 1 remaining row/col of movement, the piece was not blocked
-                return False
-
-        elif self._move_direction == 'north':
-            proposed_row_change = proposed_row_change * - 1
-            center = center_from
-            while proposed_row_change > 1:
-                potential_blockages = self.get_north_row(self._board, self.get_north_location(center))
-                center = self.get_north_location(center)
-                proposed_row_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            else:
-                return False
-
-        elif self._move_direction == 'east':
-            center = center_from
-            while proposed_column_change > 1:
-                potential_blockages = self.get_east_row(self._board, self.get_east_location(center))
-                center = self.get_east_location(center)
-                proposed_column_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            else:
-                return False
-
-        elif self._move_direction == 'west':
-            proposed_column_change = proposed_column_change * - 1
-            center = center_from
-            while proposed_column_change > 1:
-                potential_blockages = self.get_west_row(self._board, self.get_west_location(center))
-                center = self.get_west_location(center)
-                proposed_column_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            else:
-                return False
-
-        elif self._move_direction == 'northwest':
-            # north function + west function but replaced direction we're traveling with northwest
-            proposed_row_change = proposed_row_change * - 1
-            center = center_from
-            while proposed_row_change > 1:
-                potential_blockages = self.get_north_row(self._board, self.get_north_location(center))
-                center = self.get_northwest_location(center)
-                proposed_row_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            proposed_column_change = proposed_column_change * - 1
-            center = center_from
-            while proposed_column_change > 1:
-                potential_blockages = self.get_west_row(self._board, self.get_west_location(center))
-                center = self.get_northwest_location(center)
-                proposed_column_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            else:
-                return False
-
-        elif self._move_direction == 'northeast':
-            # north function + east function but replaced direction we're traveling with northeast
-            proposed_row_change = proposed_row_change * - 1
-            center = center_from
-            while proposed_row_change > 1:
-                potential_blockages = self.get_north_row(self._board, self.get_north_location(center))
-                center = self.get_northeast_location(center)
-                proposed_row_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            center = center_from
-            while proposed_column_change > 1:
-                potential_blockages = self.get_east_row(self._board, self.get_east_location(center))
-                center = self.get_northeast_location(center)
-                proposed_column_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            else:
-                return False
-
-        elif self._move_direction == 'southwest':
-            # south function + west function but replaced direction we're traveling with southwest
-            center = center_from
-            while proposed_row_change > 1:
-                potential_blockages = self.get_south_row(self._board, self.get_south_location(center))
-                center = self.get_southwest_location(center)
-                proposed_row_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            proposed_column_change = proposed_column_change * - 1
-            center = center_from
-            while proposed_column_change > 1:
-                potential_blockages = self.get_west_row(self._board, self.get_west_location(center))
-                center = self.get_southwest_location(center)
-                proposed_column_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            else:
-                return False
-
-        elif self._move_direction == 'southeast':
-            # south function + east function but replaced direction we're traveling with southeast
-            center = center_from
-            while proposed_row_change > 1:
-                potential_blockages = self.get_south_row(self._board, self.get_south_location(center))
-                center = self.get_southeast_location(center)
-                proposed_row_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            center = center_from
-            while proposed_column_change > 1:
-                potential_blockages = self.get_east_row(self._board, self.get_east_location(center))
-                center = self.get_southeast_location(center)
-                proposed_column_change -= 1
-                for element in potential_blockages:
-                    if element != ' ':
-                        return True
-            else:
-                return False
-
-    def is_valid_move(self, center_from, center_to):
-        """Checks whether move is valid, returns True or False accordingly"""
-
-        if self.center_in_gutter(center_to) is False:                                           # move does not move the center off the board
-            if self.violating_direction(center_from, center_to) is False:                       # direction limit is not violated
-                if self.violating_distance(center_from, center_to) is False:                    # distance limit is not violated
-                    if self.is_blocked(center_from, center_to) is False:                        # there are no stones in the way
-                        if self.check_for_eliminating_own_ring(center_from, center_to) is True:
-                            self._notification = "This move is invalid because it eliminates the current player's last ring"
-                            return False
-                        else:                                                                   # move does not eliminate player's own last ring
-                            return True
-                    else:
-                        self._notification = "This move is invalid because there are stones in the way."
-                        return False
-                else:                                                                           # distance is violated
-                    self._notification = "This move is invalid because it is further than the current piece is permitted to move"
-                    return False
-            else:                                                                               # direction is violated
-                self._notification = "This move is invalid because it is in a direction that is not allowed for the chosen piece."
-                return False
-        else:                                                                                   # proposed center is in the gutter
-            self._notification = "This move is invalid because the proposed center is in the board's outermost row or column."
-            return False
-
-    def draw_board(self):
-        """Creates a representation of the board for the player"""
-        square_size = 25
-        radius = 12.5
-        indent = square_size * 2
+        copy = super().clone()
+        copy._surface = None
+        copy._window = False
+        copy._drawn = None
+        copy._selected = None
+        return copy
+
+    def book_hint(self):
+        """Returns a notification suggesting the opening book's move for the current position, or '' if there is none"""
+        if self._book is None:
+            return ''
+        move = self._book.best_move(self)
+        if move is None:
+            return ''
+        for book_move, visits, win_rate in self._book.lookup(self.get_position_hash()):
+            if book_move == move:
+                return "Book: %s-%s (%d games, %d%% won)" % (self.convert_to_string(move[0]),
+                                                          self.convert_to_string(move[1]), visits, win_rate * 100)
+        return ''
+
+    def load_assets(self):
+        """Loads the fonts and pre-renders the parts of the screen that never change: background, grid and labels"""
+        if self._static is not None:
+            return
+        pygame.font.init()
         font = pygame.font.Font(None, 24)
-        font2 = pygame.font.SysFont("monospace", 20)
-        # this is important because otherwise things just accumulate on the board (stones aren't removed)
-        screen.blit(background, (0, 0))
-        for column in range(20):
-            for row in range(20):
-                # initial grid
-                pygame.draw.rect(screen, (50, 50, 50), (column * square_size + indent, row * square_size + indent, square_size, square_size), 1)
-                # populate stones
-                if self._board[row][column] == 'B':
-                    pygame.draw.circle(screen, (50, 50, 50), (int(column * square_size + indent + square_size / 2), int(row * square_size + 2 * square_size + square_size / 2)), radius)
-                if self._board[row][column] == 'W':
-                    pygame.draw.circle(screen, (250, 250, 250), (int(column * square_size + indent + square_size / 2), int(row * square_size + 2 * square_size + square_size / 2)), radius)
-                    # borders for the white stones because otherwise they are garish
-                    pygame.draw.circle(screen, (50, 50, 50), (int(column * square_size + indent + square_size / 2), int(row * square_size + 2 * square_size + square_size / 2)), radius, 1)
+        self._notification_font = pygame.font.SysFont("monospace", 20)
+        static = pygame.image.load(BACKGROUND_PATH)
+        # initial grid
+        for column in range(BOARD_SIZE):
+            for row in range(BOARD_SIZE):
+                pygame.draw.rect(static, DARK, self.square_rect(column, row), 1)
         # outside border
-        pygame.draw.rect(screen, (50, 50, 50), (indent, indent, 500, 500), 2)
+        pygame.draw.rect(static, DARK, (INDENT, INDENT, 500, 500), 2)
         # label axes
-        column_text = font.render("A   B   C    D   E    F   G   H    I     J    K   L    M   N   O    P   Q   R    S   T", 1, (50, 50, 50))
-        screen.blit(column_text, (57, 35))
-        row_1 = font.render("1", 1, (50, 50, 50))
-        row_2 = font.render("2", 1, (50, 50, 50))
-        row_3 = font.render("3", 1, (50, 50, 50))
-        row_4 = font.render("4", 1, (50, 50, 50))
-        row_5 = font.render("5", 1, (50, 50, 50))
-        row_6 = font.render("6", 1, (50, 50, 50))
-        row_7 = font.render("7", 1, (50, 50, 50))
-        row_8 = font.render("8", 1, (50, 50, 50))
-        row_9 = font.render("9", 1, (50, 50, 50))
-        row_10 = font.render("10", 1, (50, 50, 50))
-        row_11 = font.render("11", 1, (50, 50, 50))
-        row_12 = font.render("12", 1, (50, 50, 50))
-        row_13 = font.render("13", 1, (50, 50, 50))
-        row_14 = font.render("14", 1, (50, 50, 50))
-        row_15 = font.render("15", 1, (50, 50, 50))
-        row_16 = font.render("16", 1, (50, 50, 50))
-        row_17 = font.render("17", 1, (50, 50, 50))
-        row_18 = font.render("18", 1, (50, 50, 50))
-        row_19 = font.render("19", 1, (50, 50, 50))
-        row_20 = font.render("20", 1, (50, 50, 50))
-        screen.blit(row_1, (35, 57 + square_size * 0))
-        screen.blit(row_2, (35, 57 + square_size * 1))
-        screen.blit(row_3, (35, 57 + square_size * 2))
-        screen.blit(row_4, (35, 57 + square_size * 3))
-        screen.blit(row_5, (35, 57 + square_size * 4))
-        screen.blit(row_6, (35, 57 + square_size * 5))
-        screen.blit(row_7, (35, 57 + square_size * 6))
-        screen.blit(row_8, (35, 57 + square_size * 7))
-        screen.blit(row_9, (35, 57 + square_size * 8))
-        screen.blit(row_10, (27, 57 + square_size * 9))
-        screen.blit(row_11, (27, 57 + square_size * 10))
-        screen.blit(row_12, (27, 57 + square_size * 11))
-        screen.blit(row_13, (27, 57 + square_size * 12))
-        screen.blit(row_14, (27, 57 + square_size * 13))
-        screen.blit(row_15, (27, 57 + square_size * 14))
-        screen.blit(row_16, (27, 57 + square_size * 15))
-        screen.blit(row_17, (27, 57 + square_size * 16))
-        screen.blit(row_18, (27, 57 + square_size * 17))
-        screen.blit(row_19, (27, 57 + square_size * 18))
-        screen.blit(row_20, (27, 57 + square_size * 19))
-
-        # display player whose turn it is
-        # current_player_text = font.render("Turn:", 1, (50, 50, 50))
-        # screen.blit(current_player_text, (10, 570))
+        column_text = font.render("A   B   C    D   E    F   G   H    I     J    K   L    M   N   O    P   Q   R    S   T", 1, DARK)
+        static.blit(column_text, (57, 35))
+        for row in range(BOARD_SIZE):
+            row_text = font.render(str(row + 1), 1, DARK)
+            static.blit(row_text, (35 if row < 9 else 27, 57 + SQUARE_SIZE * row))
+        self._static = static
+
+    def square_rect(self, column, row):
+        """Returns the screen rect of the square at (column, row)"""
+        return pygame.Rect(column * SQUARE_SIZE + INDENT, row * SQUARE_SIZE + INDENT, SQUARE_SIZE, SQUARE_SIZE)
+
+    def render(self):
+        """Draws the board onto an off-screen surface (the window's, once run() has opened one) and returns it"""
+        self.redraw()
+        return self._surface
+
+    def render_png(self, size=None):
+        """Returns the board drawn as PNG bytes, scaled to size (width, height) if given, e.g. for thumbnails"""
+        surface = self.render()
+        if size is not None:
+            surface = pygame.transform.smoothscale(surface, size)
+        buffer = io.BytesIO()
+        pygame.image.save(surface, buffer, 'board.png')
+        return buffer.getvalue()
+
+    def draw_square(self, index):
+        """Redraws the square at index (row * 20 + column) from the pre-rendered grid plus its stone, returns its rect"""
+        row, column = divmod(index, BOARD_SIZE)
+        rect = self.square_rect(column, row)
+        self._surface.blit(self._static, rect, rect)
+        stone = self.get_center(self._board, (column, row))
+        if stone == 'B':
+            pygame.draw.circle(self._surface, DARK, rect.center, RADIUS)
+        elif stone == 'W':
+            pygame.draw.circle(self._surface, LIGHT, rect.center, RADIUS)
+            # borders for the white stones because otherwise they are garish
+            pygame.draw.circle(self._surface, DARK, rect.center, RADIUS, 1)
+        return rect
+
+    def draw_status(self):
+        """Redraws the marker of the player whose turn it is and the notification, returns their rects"""
+        screen = self._surface
+        screen.blit(self._static, PLAYER_RECT, PLAYER_RECT)
         if self._current_player == 'BLACK':
-            pygame.draw.circle(screen, (50, 50, 50), (25, 25), radius)
+            pygame.draw.circle(screen, DARK, PLAYER_RECT.center, RADIUS)
         if self._current_player == 'WHITE':
-            pygame.draw.circle(screen, (250, 250, 250), (25, 25), radius)
-            pygame.draw.circle(screen, (50, 50, 50), (25, 25), radius, 1)
-        pygame.display.update()
-
+            pygame.draw.circle(screen, LIGHT, PLAYER_RECT.center, RADIUS)
+            pygame.draw.circle(screen, DARK, PLAYER_RECT.center, RADIUS, 1)
         # display message for user
-        display_text = font2.render(self._notification, 1, (50, 50, 50))
+        screen.blit(self._static, NOTIFICATION_RECT, NOTIFICATION_RECT)
+        display_text = self._notification_font.render(self._notification, 1, DARK)
         screen.blit(display_text, (5, 570))
+        return [PLAYER_RECT, NOTIFICATION_RECT]
 
-    def identify_click(self, click):
-        """Translates the user's click into coordinates for the program"""
-        # board starts at 50 pixels, each square is 25 pixels
-        interpretation = ''
-        if 75 > click <= 100:
-            interpretation = 'a1'
-        elif 100 > click <= 125:
-            interpretation = 'b2'
-        elif 125 > click <= 150:
-            interpretation = 'c3'
-        elif 150 > click <= 175:
-            interpretation = 'd4'
-        elif 175 > click <= 200:
-            interpretation = 'e5'
-        elif 200 > click <= 225:
-            interpretation = 'f6'
-        elif 225 > click <= 250:
-            interpretation = 'g7'
-        elif 250 > click <= 275:
-            interpretation = 'h8'
-        elif 275 > click <= 300:
-            interpretation = 'i9'
-        elif 300 > click <= 325:
-            interpretation = 'j10'
-        elif 325 > click <= 350:
-            interpretation = 'k11'
-        elif 350 > click <= 375:
-            interpretation = 'l12'
-        elif 375 > click <= 400:
-            interpretation = 'm13'
-        elif 400 > click <= 425:
-            interpretation = 'n14'
-        elif 425 > click <= 450:
-            interpretation = 'o15'
-        elif 450 > click <= 475:
-            interpretation = 'p16'
-        elif 475 > click <= 500:
-            interpretation = 'q17'
-        elif 500 > click <= 525:
-            interpretation = 'r18'
-        elif 525 > click <= 550:
-            interpretation = 's19'
-        elif 550 > click <= 575:
-            interpretation = 't20'
-        return interpretation
-
-
-# create new game
-game = GessGame()
-# initialize pygame -- set screen size, window name, background image,
-pygame.init()
-screen = pygame.display.set_mode((600, 600))
-pygame.display.set_caption("Gess!")
-background = pygame.image.load("background.png")
-screen.blit(background, (0, 0))
-# draw the board -- grid lines, pieces, etc & update display
-game.draw_board()
-pygame.display.update()
-
-from_center = None
-to_center = None
-
-while game.get_game_state() == 'UNFINISHED':
-    for event in pygame.event.get():
-
-        # makes it possible to close the board
-        if event.type == pygame.QUIT:
-            sys.exit()
-
-        # get moves from user  -- first click - starting position
-        if event.type == pygame.MOUSEBUTTONDOWN and from_center is None:
-            starting_position_x_pixels = event.pos[0]
-            starting_position_x_column = game.identify_click(starting_position_x_pixels)[0]
-            starting_position_y_pixels = event.pos[1]
-            starting_position_y_row = game.identify_click(starting_position_y_pixels)[1:]
-            # translated position
-            from_center = starting_position_x_column + starting_position_y_row
-            game.set_notification('Selected from center: ' + str(from_center))
-            game.draw_board()
+    def draw_board(self):
+        """
+        Creates a representation of the board for the player, drawing the whole screen (onto a new off-screen surface
+        if nothing has been drawn yet and no window is open)
+        """
+        if self._surface is None:
+            self._surface = pygame.Surface(SCREEN_SIZE)
+        self.load_assets()
+        self._surface.blit(self._static, (0, 0))
+        stones = self._board[0] | self._board[1]
+        while stones:
+            low_bit = stones & -stones
+            self.draw_square(low_bit.bit_length() - 1)
+            stones ^= low_bit
+        self.draw_status()
+        self._drawn = (self._board[0], self._board[1], self._current_player, self._notification)
+        if self._window:
             pygame.display.update()
 
-
-        # get moves from user  -- second click - ending position
-        elif event.type == pygame.MOUSEBUTTONDOWN and from_center is not None:
-            starting_position_x_pixels = event.pos[0]
-            starting_position_x_column = game.identify_click(starting_position_x_pixels)[0]
-            starting_position_y_pixels = event.pos[1]
-            starting_position_y_row = game.identify_click(starting_position_y_pixels)[1:]
-            # translated position
-            to_center = starting_position_x_column + starting_position_y_row
-            # game.set_notification('selected to center: ' + str(to_center))
-            game.set_notification('')
+    def redraw(self):
+        """
+        Brings the screen up to date with the game, redrawing only the squares whose stones changed since the last
+        draw (and the turn marker and notification if they changed). Returns the rects that were redrawn.
+        """
+        if self._drawn is None:
+            self.draw_board()
+            return [self._surface.get_rect()]
+        black, white, current_player, notification = self._drawn
+        changed = (black ^ self._board[0]) | (white ^ self._board[1])
+        rects = []
+        while changed:
+            low_bit = changed & -changed
+            rects.append(self.draw_square(low_bit.bit_length() - 1))
+            changed ^= low_bit
+        if current_player != self._current_player or notification != self._notification:
+            rects.extend(self.draw_status())
+        self._drawn = (self._board[0], self._board[1], self._current_player, self._notification)
+        if self._window and rects:
+            pygame.display.update(rects)
+        return rects
+
+    def identify_click(self, position):
+        """Translates the pixel position (x, y) of the user's click into the square's (column, row), or None if off the board"""
+        # board starts at 50 pixels, each square is 25 pixels
+        column = (position[0] - INDENT) // SQUARE_SIZE
+        row = (position[1] - INDENT) // SQUARE_SIZE
+        if 0 <= column < BOARD_SIZE and 0 <= row < BOARD_SIZE:
+            return column, row
+        return None
+
+    def handle_click(self, position):
+        """Handles a click at pixel position (x, y): the first click picks the piece, the second tries the move"""
+        center = self.identify_click(position)
+        if center is None:                                  # clicks off the board are ignored
+            return
+        if self._selected is None:                          # first click - starting position
+            self._selected = center
+            self.set_notification('Selected from center: ' + self.convert_to_string(center))
+        else:                                               # second click - ending position
+            self.set_notification('')
             # attempt to make move given both positions
-            if game.make_move(from_center, to_center) is True:
-                game.draw_board()
-                pygame.display.update()
-                from_center = None
-                to_center = None
-            elif game.make_move(from_center, to_center) is False:
-                game.draw_board()
+            if self.make_move_at(self._selected, center) and self.get_game_state() == 'UNFINISHED':
+                self.set_notification(self.book_hint())
+            self._selected = None
+        self.redraw()
+
+    def run(self):
+        """Opens a window and lets two players play the game in it by clicking, until it is won or the window is closed"""
+        # initialize pygame -- set screen size, window name, background image,
+        pygame.init()
+        self._surface = pygame.display.set_mode(SCREEN_SIZE)
+        self._window = True
+        pygame.display.set_caption("Gess!")
+        pygame.event.set_blocked(None)                      # wake only for the events handled below
+        pygame.event.set_allowed([pygame.QUIT, pygame.MOUSEBUTTONDOWN, pygame.WINDOWEXPOSED])
+        self._notification = self.book_hint()
+        # draw the board -- grid lines, pieces, etc & update display
+        self.draw_board()
+
+        while self.get_game_state() == 'UNFINISHED':
+            event = pygame.event.wait()                     # sleeps until there is something to do
+            # makes it possible to close the board
+            if event.type == pygame.QUIT:
+                break
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                self.handle_click(event.pos)
+            elif event.type == pygame.WINDOWEXPOSED:        # the window manager lost what was on screen
                 pygame.display.update()
-                from_center = None
-                to_center = None
-
-        if game.get_game_state() != 'UNFINISHED':
-            pygame.time.wait(3000)
+        else:
+            pygame.time.wait(3000)                          # leave the winner on screen for a moment
+        pygame.quit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Play Gess in a window")
+    parser.add_argument('--book', help="opening book (see GessBook) to suggest moves from")
+    arguments = parser.parse_args()
+    opening_book = None
+    if arguments.book:
+        from GessBook import OpeningBook
+        opening_book = OpeningBook.load(arguments.book)
+    GessGameWithGUI(opening_book).run()
@@ -0,0 +1,77 @@
+# Description: Perft for Gess -- counts the leaves of the legal move tree, to check and time move generation
+
+import argparse
+import multiprocessing
+import time
+
+from GessGame import GessGame
+
+KNOWN_COUNTS = {1: 319, 2: 101761}  # perft from the starting position, to check move generation against
+
+
+def perft(game, depth):
+    """
+    Returns the number of move sequences depth moves long from game's position (game is left unchanged).
+    Games that end before depth (a player loses their last ring or cannot move) add nothing.
+    """
+    if depth == 0:
+        return 1
+    if game.get_game_state() != 'UNFINISHED':
+        return 0
+    if depth == 1:                                      # the leaves are the legal moves, no need to make them
+        return sum(1 for move in game.legal_moves())
+    nodes = 0
+    for center_from, center_to in game.legal_moves():
+        game.push_move(center_from, center_to)
+        nodes += perft(game, depth - 1)
+        game.pop_move()
+    return nodes
+
+
+def perft_move(task):
+    """Pool task: makes the move of (game, move, depth) and returns (move, perft of the rest of the tree)"""
+    game, move, depth = task
+    game.push_move(move[0], move[1])
+    nodes = perft(game, depth - 1)
+    game.pop_move()
+    return move, nodes
+
+
+def divide(game, depth, workers=1):
+    """
+    Returns {move: perft of the position after it} for every legal move of game's position, the moves given as
+    pairs of (column, row) centers. With workers > 1 the root moves are spread over that many processes.
+    """
+    if depth == 0 or game.get_game_state() != 'UNFINISHED':
+        return {}
+    tasks = [(game, move, depth) for move in game.legal_moves()]
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            return dict(pool.imap(perft_move, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    return dict(perft_move(task) for task in tasks)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Count the leaves of the Gess legal move tree")
+    parser.add_argument('depth', type=int, help="moves deep to count")
+    parser.add_argument('--divide', action='store_true', help="print the count below each root move")
+    parser.add_argument('--workers', type=int, default=1, help="processes to spread the root moves over")
+    parser.add_argument('--fen', help="position to start from (see GessGame.to_fen), the starting board by default")
+    parser.add_argument('--verify', action='store_true', help="check the count against KNOWN_COUNTS")
+    arguments = parser.parse_args()
+    if arguments.verify and (arguments.fen or arguments.depth not in KNOWN_COUNTS):
+        parser.error("--verify needs the starting position and a depth of " + ", ".join(map(str, KNOWN_COUNTS)))
+    root = GessGame.from_fen(arguments.fen) if arguments.fen else GessGame()
+    start = time.perf_counter()
+    if arguments.divide or arguments.workers > 1:
+        counts = divide(root, arguments.depth, arguments.workers)
+        total = sum(counts.values())
+        if arguments.divide:
+            for (root_from, root_to), count in sorted(counts.items()):
+                print("%s-%s: %d" % (root.convert_to_string(root_from), root.convert_to_string(root_to), count))
+    else:
+        total = perft(root, arguments.depth)
+    seconds = time.perf_counter() - start
+    print("perft(%d) = %d in %.2fs (%.0f nodes/s)" % (arguments.depth, total, seconds, total / seconds if seconds else 0))
+    if arguments.verify and total != KNOWN_COUNTS[arguments.depth]:
+        raise SystemExit("expected perft(%d) = %d" % (arguments.depth, KNOWN_COUNTS[arguments.depth]))
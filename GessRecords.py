@@ -0,0 +1,205 @@
+# Description: Append-only, memory-mapped store of Gess game records with an index from position hash to games
+
+import argparse
+import json
+import mmap
+import os
+import struct
+
+from GessGame import GessGame, BOARD_SIZE, GAME_STATES, square_index
+
+DATA_MAGIC = b'GESSREC1'
+INDEX_MAGIC = b'GESSIDX1'
+RECORD_HEADER = struct.Struct('<HB')        # number of moves, index of the final game state in GAME_STATES
+MOVE = struct.Struct('<HH')                 # square_index of the move's center_from and center_to
+INDEX_HEADER = struct.Struct('<8sQ')        # magic, length of the data file the index covers
+INDEX_ENTRY = struct.Struct('<QQ')          # position hash, offset of a game that reached the position
+
+
+def parse_move(move):
+    """Returns a move given as 'c3-c4' or as a pair of 'c3' / (column, row) centers as a pair of (column, row) centers"""
+    if isinstance(move, str):
+        move = move.split('-')
+    return tuple(center if isinstance(center, tuple) else ('abcdefghijklmnopqrst'.index(center[0]), int(center[1:]) - 1)
+                 for center in move)
+
+
+class GameRecordStore:
+    """
+    Represents an archive of finished (or abandoned) games kept in two files:
+    - path: every game appended as a record (move count, final state, then the moves), after an 8-byte magic
+    - path + '.idx': (position hash, game offset) pairs sorted by hash, for every position each game reached
+    Both files are memory-mapped, and lookups read straight from the mappings. The index is brought up to date by
+    build_index, which replays only the games appended since it last ran.
+    """
+
+    def __init__(self, path):
+        """Opens (or creates) the store at path"""
+        self._path = path
+        self._index_path = path + '.idx'
+        if not os.path.exists(path):
+            with open(path, 'wb') as data_file:
+                data_file.write(DATA_MAGIC)
+        self._data = None
+        self._index = None
+        self._index_entries = None                  # memoryview of the index entries as 64-bit words
+        self.refresh()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Unmaps the files"""
+        if self._index_entries is not None:
+            self._index_entries.release()
+            self._index_entries = None
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+
+    def refresh(self):
+        """Maps the files again so games and index entries written since they were mapped become visible"""
+        self.close()
+        with open(self._path, 'rb') as data_file:
+            self._data = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(DATA_MAGIC)] != DATA_MAGIC:
+            raise ValueError("%s is not a Gess game record file" % self._path)
+        if os.path.exists(self._index_path):
+            with open(self._index_path, 'rb') as index_file:
+                self._index = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._index[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+                raise ValueError("%s is not a Gess position index" % self._index_path)
+            self._index_entries = memoryview(self._index)[INDEX_HEADER.size:].cast('Q')
+
+    def append_game(self, moves, game_state):
+        """
+        Appends a game given as its moves (see parse_move) and its final game state, returns the game's offset.
+        Call refresh (or build_index) to see it in lookups.
+        """
+        moves = [parse_move(move) for move in moves]
+        record = bytearray(RECORD_HEADER.pack(len(moves), GAME_STATES.index(game_state)))
+        for center_from, center_to in moves:
+            record += MOVE.pack(square_index(center_from), square_index(center_to))
+        with open(self._path, 'ab') as data_file:
+            offset = data_file.tell()
+            data_file.write(record)
+        return offset
+
+    def import_selfplay(self, jsonl_path):
+        """Appends every game in a GessSelfPlay output file, returns the number of games appended"""
+        count = 0
+        with open(jsonl_path) as records:
+            for line in records:
+                record = json.loads(line)
+                self.append_game(record['moves'], record['winner'])
+                count += 1
+        return count
+
+    def game_offsets(self):
+        """Yields the offset of every game in the store"""
+        offset = len(DATA_MAGIC)
+        while offset < len(self._data):
+            yield offset
+            move_count = RECORD_HEADER.unpack_from(self._data, offset)[0]
+            offset += RECORD_HEADER.size + move_count * MOVE.size
+
+    def read_game(self, offset):
+        """Returns (moves, final game state) of the game at offset, moves as pairs of (column, row) centers"""
+        move_count, state_index = RECORD_HEADER.unpack_from(self._data, offset)
+        moves = []
+        for move_offset in range(offset + RECORD_HEADER.size, offset + RECORD_HEADER.size + move_count * MOVE.size,
+                                 MOVE.size):
+            center_from, center_to = MOVE.unpack_from(self._data, move_offset)
+            moves.append((divmod(center_from, BOARD_SIZE)[::-1], divmod(center_to, BOARD_SIZE)[::-1]))
+        return moves, GAME_STATES[state_index]
+
+    def read_game_state(self, offset):
+        """Returns only the final game state of the game at offset"""
+        return GAME_STATES[self._data[offset + 2]]
+
+    def build_index(self):
+        """
+        Replays every game appended since the index was last built through GessGame.make_move and adds its positions
+        to the index. Returns the number of games replayed. Games with an illegal move are indexed up to that move.
+        """
+        self.refresh()
+        covered = len(DATA_MAGIC)
+        entries = []
+        if self._index is not None:
+            covered = INDEX_HEADER.unpack_from(self._index, 0)[1]
+            entries = [(self._index_entries[word], self._index_entries[word + 1])
+                       for word in range(0, len(self._index_entries), 2)]
+        replayed = 0
+        for offset in self.game_offsets():
+            if offset < covered:
+                continue
+            moves, game_state = self.read_game(offset)
+            game = GessGame()
+            reached = {game.get_position_hash()}
+            for center_from, center_to in moves:
+                if not game.make_move(game.convert_to_string(center_from), game.convert_to_string(center_to),
+                                      verbose=False):
+                    break
+                reached.add(game.get_position_hash())
+            entries.extend((position_hash, offset) for position_hash in reached)
+            replayed += 1
+        entries.sort()
+        data_length = len(self._data)
+        self.close()
+        with open(self._index_path + '.tmp', 'wb') as index_file:
+            index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, data_length))
+            for entry in entries:
+                index_file.write(INDEX_ENTRY.pack(*entry))
+        os.replace(self._index_path + '.tmp', self._index_path)      # readers never see a half-written index
+        self.refresh()
+        return replayed
+
+    def games_with_position(self, position_hash):
+        """Returns the offsets of the indexed games that reached the position (see GessGame.get_position_hash)"""
+        if self._index_entries is None:
+            return []
+        words = self._index_entries
+        low, high = 0, len(words) // 2             # binary search for the first entry with this hash
+        while low < high:
+            middle = (low + high) // 2
+            if words[2 * middle] < position_hash:
+                low = middle + 1
+            else:
+                high = middle
+        offsets = []
+        while low < len(words) // 2 and words[2 * low] == position_hash:
+            offsets.append(words[2 * low + 1])
+            low += 1
+        return offsets
+
+    def position_stats(self, position_hash):
+        """Returns how often each final game state followed the position, e.g. {'BLACK_WON': 3, 'WHITE_WON': 1, ...}"""
+        stats = dict.fromkeys(GAME_STATES, 0)
+        for offset in self.games_with_position(position_hash):
+            stats[self.read_game_state(offset)] += 1
+        return stats
+
+    def win_rate(self, position_hash, player):
+        """Returns the share of finished games through the position that player ('BLACK' or 'WHITE') won, or None"""
+        stats = self.position_stats(position_hash)
+        finished = stats['BLACK_WON'] + stats['WHITE_WON']
+        if finished == 0:
+            return None
+        return stats[player + '_WON'] / finished
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Import self-play games into a record store and index them")
+    parser.add_argument('store', help="path of the game record file")
+    parser.add_argument('selfplay', nargs='*', help="GessSelfPlay output files to import")
+    arguments = parser.parse_args()
+    with GameRecordStore(arguments.store) as store:
+        for jsonl_path in arguments.selfplay:
+            print("imported %d games from %s" % (store.import_selfplay(jsonl_path), jsonl_path))
+        print("indexed %d new games" % store.build_index())
@@ -0,0 +1,399 @@
+# Description: Alpha-beta search that picks a move for the player whose turn it is in a GessGame
+
+import argparse
+import multiprocessing
+import os
+import random
+import time
+
+from GessEndgame import is_endgame, WIN, LOSS, UNKNOWN
+from GessGame import GessGame, NEIGHBOR_OFFSETS, count_bits, footprint, shift
+from GessTransposition import TranspositionTable, SharedTranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+WIN_SCORE = 1000000                 # score of a won position (less the number of moves it takes to get there)
+RING_VALUE = 100                    # each ring is worth this many stones
+RING_THREAT_BONUS = 1000            # move ordering bonus for landing on an opponent's ring
+TARGET_NODES_PER_SECOND = 1000      # throughput the benchmark below is expected to reach
+CHECK_DEADLINE_EVERY = 256          # nodes between reads of the clock (the node budget is checked at every node)
+
+
+class SearchBudgetExceeded(Exception):
+    """Raised inside the search when the time or node budget runs out"""
+    pass
+
+
+def other_player(player):
+    """Returns the opponent of player ('BLACK' or 'WHITE')"""
+    if player == 'BLACK':
+        return 'WHITE'
+    else:
+        return 'BLACK'
+
+
+def ring_stones(ring_centers):
+    """Returns the mask of the stones that make up the rings with the centers provided"""
+    stones = 0
+    for offset in NEIGHBOR_OFFSETS:
+        stones |= shift(ring_centers, offset)
+    return stones
+
+
+def evaluate(game):
+    """Scores the position for the player whose turn it is: rings first, then stones"""
+    player = game.get_current_player()
+    opponent = other_player(player)
+    ring_difference = count_bits(game.get_ring_centers(player)) - count_bits(game.get_ring_centers(opponent))
+    stone_difference = count_bits(game.get_stones(player)) - count_bits(game.get_stones(opponent))
+    return ring_difference * RING_VALUE + stone_difference
+
+
+class GessSearch:
+    """
+    Represents a negamax alpha-beta search with iterative deepening.
+    The search deepens one move at a time until it reaches max_depth or runs out of its time or node budget, and
+    returns the best move of the deepest search it finished. Results are kept in a transposition table, and moves
+    are searched best-first: the table's move, then moves that land on an opponent's ring, then captures.
+    With an opening book (GessBook.OpeningBook), positions in the book are answered from it without searching.
+    With an endgame cache (GessEndgame.EndgameCache), endgame positions are looked up there before being expanded,
+    and the wins and losses the search proves are added to it.
+    """
+
+    def __init__(self, table=None, book=None, endgame=None):
+        """Initializes members of class GessSearch"""
+        if table is None:
+            table = TranspositionTable()
+        self._table = table
+        self._book = book
+        self._endgame = endgame
+        self._nodes = 0                             # positions visited by the current search
+        self._node_limit = None
+        self._deadline = None                       # time.perf_counter() value to stop at
+        self._elapsed = 0.0                         # seconds taken by the last search
+        self._best_move = None                      # best root move of the iteration being searched
+        self._root_moves = None                     # root moves to search instead of every legal move
+
+    def get_node_count(self):
+        """Returns the number of positions visited by the last search"""
+        return self._nodes
+
+    def get_nodes_per_second(self):
+        """Returns the throughput of the last search"""
+        if self._elapsed == 0:
+            return 0.0
+        return self._nodes / self._elapsed
+
+    def find_best_move(self, game, max_depth=3, time_limit=None, node_limit=None):
+        """
+        Searches game (left unchanged) and returns (best move, score), where the move is a (center_from, center_to)
+        pair of (column, row) centers, or None if the player to move has no legal move.
+        time_limit is in seconds; with neither limit the search always finishes max_depth.
+        A move taken from the opening book is returned with a score of 0, as is the first move in search order (see
+        first_root_move) when the budget runs out before the search has found any.
+        """
+        self.start_budget(time_limit, node_limit)
+        self._elapsed = 0.0
+        if self._book is not None:
+            book_move = self._book.best_move(game)
+            if book_move is not None:
+                return book_move, 0
+        self._table.new_search()
+        start = time.perf_counter()
+        best_move, best_score = None, 0
+        for depth in range(1, max_depth + 1):
+            move, score, finished = self.search_root(game, depth)
+            if not finished:
+                if best_move is None:                               # keep what the unfinished iteration found
+                    best_move = move
+                break
+            best_move, best_score = move, score
+            if abs(score) >= WIN_SCORE - max_depth:                 # a forced result, deeper search will not change it
+                break
+        if best_move is None:                                       # out of budget before any move was searched
+            best_move = self.first_root_move(game)
+        self._elapsed = time.perf_counter() - start
+        return best_move, best_score
+
+    def first_root_move(self, game):
+        """Returns the legal move the search of game would try first (see order_moves), or None if there is none"""
+        entry = self._table.probe(game.get_position_hash())
+        moves = self.order_moves(game, game.legal_moves(), entry[3] if entry else None)
+        if not moves:
+            return None
+        return moves[0]
+
+    def start_budget(self, time_limit=None, node_limit=None):
+        """Resets the node count and starts the time (seconds) and node budgets for the next searches"""
+        self._nodes = 0
+        self._node_limit = node_limit
+        self._deadline = None
+        if time_limit is not None:
+            self._deadline = time.perf_counter() + time_limit
+
+    def search_root(self, game, depth, root_moves=None):
+        """
+        Searches game depth moves deep, considering only root_moves (every legal move by default) for the first move.
+        Returns (best move, score, finished); when the budget runs out first, finished is False, the move is the best
+        found so far (or None) and the score is None.
+        """
+        self._best_move = None
+        self._root_moves = root_moves
+        try:
+            score = self.negamax(game, depth, -WIN_SCORE - 1, WIN_SCORE + 1, 0)
+        except SearchBudgetExceeded:
+            return self._best_move, None, False
+        finally:
+            self._root_moves = None
+            if self._endgame is not None:
+                self._endgame.flush()
+        return self._best_move, score, True
+
+    def check_deadline(self):
+        """Raises SearchBudgetExceeded when the search has used up its time"""
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchBudgetExceeded
+
+    def order_moves(self, game, moves, table_move):
+        """Returns moves sorted best-first: table_move, then landing on an opponent's ring, then most stones captured"""
+        opponent = other_player(game.get_current_player())
+        opponent_stones = game.get_stones(opponent)
+        opponent_rings = ring_stones(game.get_ring_centers(opponent))
+        scored = []
+        for move in moves:
+            if move == table_move:
+                score = 2 * RING_THREAT_BONUS * RING_VALUE
+            else:
+                landing = footprint(move[1]) & ~footprint(move[0])
+                score = count_bits(landing & opponent_stones)
+                if landing & opponent_rings:
+                    score += RING_THREAT_BONUS
+            scored.append((score, move))
+        scored.sort(key=lambda scored_move: scored_move[0], reverse=True)
+        return [move for score, move in scored]
+
+    def negamax(self, game, depth, alpha, beta, ply):
+        """Returns the score of game for the player to move, searched depth moves deep within the (alpha, beta) window"""
+        if self._node_limit is not None and self._nodes >= self._node_limit:     # exact, so checked at every node
+            raise SearchBudgetExceeded
+        self._nodes += 1
+        if self._nodes % CHECK_DEADLINE_EVERY == 0:
+            self.check_deadline()
+        if game.get_game_state() != 'UNFINISHED':                   # the previous move took the last ring
+            return -WIN_SCORE + ply
+        endgame = self._endgame is not None and is_endgame(game)
+        if endgame and ply > 0:
+            entry = self._endgame.probe(game.get_position_hash())
+            if entry is not None and entry[0] != UNKNOWN:           # a proven result, scored like a searched one
+                return entry[0] * (WIN_SCORE - ply - entry[1])
+        if depth == 0:
+            return evaluate(game)
+
+        position_hash = game.get_position_hash()
+        table_move = None
+        entry = self._table.probe(position_hash)
+        if entry is not None:
+            entry_depth, entry_value, entry_flag, table_move = entry
+            if entry_depth >= depth and ply > 0:
+                if entry_flag == EXACT:
+                    return entry_value
+                elif entry_flag == LOWER_BOUND and entry_value >= beta:
+                    return entry_value
+                elif entry_flag == UPPER_BOUND and entry_value <= alpha:
+                    return entry_value
+
+        if ply == 0 and self._root_moves is not None:
+            moves = self.order_moves(game, self._root_moves, table_move)
+        else:
+            moves = self.order_moves(game, game.legal_moves(), table_move)
+        if not moves:                                               # no legal move, the player can only resign
+            return -WIN_SCORE + ply
+
+        original_alpha = alpha
+        best_score = -WIN_SCORE - 1
+        best_move = None
+        for move in moves:
+            game.push_move(move[0], move[1])
+            try:
+                score = -self.negamax(game, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.pop_move()                                     # also undoes the move when the budget runs out
+            if score > best_score:
+                best_score, best_move = score, move
+                if ply == 0:
+                    self._best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        if ply > 0 or self._root_moves is None:                     # a score over some root moves is not the position's
+            self._table.store(position_hash, depth, best_score, flag, best_move)
+            if endgame and abs(best_score) > WIN_SCORE // 2:
+                distance = WIN_SCORE - abs(best_score) - ply
+                if best_score > 0 and flag != UPPER_BOUND:          # some move is proven to win
+                    self._endgame.store(position_hash, WIN, distance)
+                elif best_score < 0 and flag != LOWER_BOUND:        # every move is proven to lose
+                    self._endgame.store(position_hash, LOSS, distance)
+        return best_score
+
+
+worker_search = None                # each pool process's GessSearch, set up by start_worker
+
+
+def start_worker(table, endgame=None):
+    """Pool initializer: gives the worker process a search that uses the shared transposition table"""
+    global worker_search
+    worker_search = GessSearch(table, endgame=endgame)
+
+
+def search_root_moves(task):
+    """Pool task: searches (game, root moves, depth, time limit, node limit), returns (move, score, finished, nodes)"""
+    game, root_moves, depth, time_limit, node_limit = task
+    worker_search.start_budget(time_limit, node_limit)
+    move, score, finished = worker_search.search_root(game, depth, root_moves)
+    return move, score, finished, worker_search.get_node_count()
+
+
+class ParallelGessSearch:
+    """
+    Represents a root-parallel version of GessSearch that spreads the root moves over a pool of processes.
+    At each depth of the iterative deepening the ordered root moves are dealt round-robin to the workers, each
+    worker runs alpha-beta over its share, and the best of their results is kept. All workers read and write one
+    SharedTranspositionTable, so a position searched by one worker is not searched again by another.
+    Call close() (or use the search as a context manager) to stop the workers and free the table.
+    """
+
+    def __init__(self, workers=None, table_size=1 << 20, book=None, endgame=None):
+        """Initializes members of class ParallelGessSearch and starts the worker processes"""
+        if workers is None:
+            workers = os.cpu_count()
+        self._workers = workers
+        self._book = book
+        self._table = SharedTranspositionTable(table_size)
+        self._pool = multiprocessing.Pool(workers, initializer=start_worker, initargs=(self._table, endgame))
+        self._orderer = GessSearch(self._table)     # orders root moves using the table's best moves
+        self._nodes = 0
+        self._elapsed = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stops the worker processes and frees the shared transposition table"""
+        self._pool.close()
+        self._pool.join()
+        self._table.close()
+
+    def get_node_count(self):
+        """Returns the number of positions visited by the last search, over all workers"""
+        return self._nodes
+
+    def get_nodes_per_second(self):
+        """Returns the throughput of the last search, over all workers"""
+        if self._elapsed == 0:
+            return 0.0
+        return self._nodes / self._elapsed
+
+    def find_best_move(self, game, max_depth=3, time_limit=None, node_limit=None):
+        """Same as GessSearch.find_best_move, with the node limit shared by all workers"""
+        self._nodes = 0
+        self._elapsed = 0.0
+        if self._book is not None:
+            book_move = self._book.best_move(game)
+            if book_move is not None:
+                return book_move, 0
+        self._table.new_search()
+        start = time.perf_counter()
+        best_move, best_score = None, 0
+        root_moves = list(game.legal_moves())
+        if not root_moves:
+            return None, -WIN_SCORE
+        for depth in range(1, max_depth + 1):
+            remaining_time = None
+            if time_limit is not None:
+                remaining_time = time_limit - (time.perf_counter() - start)
+                if remaining_time <= 0:
+                    break
+            remaining_nodes = None
+            if node_limit is not None:
+                remaining_nodes = (node_limit - self._nodes) // self._workers
+                if remaining_nodes <= 0:
+                    break
+            entry = self._table.probe(game.get_position_hash())
+            ordered = self._orderer.order_moves(game, root_moves, entry[3] if entry else None)
+            tasks = [(game, ordered[worker::self._workers], depth, remaining_time, remaining_nodes)
+                     for worker in range(min(self._workers, len(ordered)))]
+            results = self._pool.map(search_root_moves, tasks)
+            self._nodes += sum(result[3] for result in results)
+            if not all(result[2] for result in results):
+                if best_move is None:                               # keep the best move any worker found
+                    found = [result[0] for result in results if result[0] is not None]
+                    if found:
+                        best_move = found[0]
+                break
+            move, score = max(((result[0], result[1]) for result in results), key=lambda result: result[1])
+            best_move, best_score = move, score
+            self._table.store(game.get_position_hash(), depth, score, EXACT, move)
+            if abs(score) >= WIN_SCORE - max_depth:                 # a forced result, deeper search will not change it
+                break
+        if best_move is None:                                       # out of budget before any move was searched
+            best_move = self._orderer.first_root_move(game)
+        self._elapsed = time.perf_counter() - start
+        return best_move, best_score
+
+
+def benchmark_positions(count=3, seed=0, plies=20):
+    """Returns the starting position plus count - 1 positions reached by random legal moves (reproducible from seed)"""
+    generator = random.Random(seed)
+    positions = [GessGame()]
+    while len(positions) < count:
+        game = GessGame()
+        for _ in range(plies):
+            moves = list(game.legal_moves())
+            if not moves:
+                break
+            game.push_move(*generator.choice(moves))
+        if game.get_game_state() == 'UNFINISHED':
+            positions.append(game)
+    return positions
+
+
+def benchmark(depth=2, positions=3, workers=1):
+    """Searches the benchmark positions to depth (with a ParallelGessSearch if workers > 1), returns nodes per second"""
+    total_nodes = 0
+    total_time = 0.0
+    for number, game in enumerate(benchmark_positions(positions)):
+        if workers > 1:
+            search = ParallelGessSearch(workers)
+        else:
+            search = GessSearch()
+        start = time.perf_counter()
+        move, score = search.find_best_move(game, max_depth=depth)
+        seconds = time.perf_counter() - start
+        total_nodes += search.get_node_count()
+        total_time += seconds
+        if workers > 1:
+            search.close()
+        print("position %d: %d nodes in %.2fs (%.0f nodes/s), best move %s score %d"
+              % (number, search.get_node_count(), seconds, search.get_nodes_per_second(), move, score))
+    nodes_per_second = total_nodes / total_time
+    print("total: %.0f nodes/s (target %d)" % (nodes_per_second, TARGET_NODES_PER_SECOND * workers))
+    return nodes_per_second
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the Gess search against its nodes-per-second target")
+    parser.add_argument('--depth', type=int, default=2, help="search depth for each position")
+    parser.add_argument('--positions', type=int, default=3, help="number of positions to search")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes (target scales with workers)")
+    arguments = parser.parse_args()
+    if benchmark(arguments.depth, arguments.positions, arguments.workers) < TARGET_NODES_PER_SECOND * arguments.workers:
+        raise SystemExit("below target nodes per second")
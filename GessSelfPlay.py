@@ -0,0 +1,87 @@
+# Description: Headless self-play simulator that plays many Gess games in parallel and streams the results to a file
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+from GessGame import GessGame
+from GessSearch import evaluate
+
+MAX_MOVES = 500                     # games still unfinished after this many moves are recorded as 'UNFINISHED'
+
+
+def choose_random(game, moves, generator):
+    """Policy: any legal move"""
+    return generator.choice(moves)
+
+
+def choose_greedy(game, moves, generator):
+    """Policy: the move that leaves the best position after one move (ties broken at random)"""
+    best_score = None
+    best_moves = []
+    for move in moves:
+        game.push_move(move[0], move[1])
+        if game.get_game_state() != 'UNFINISHED':               # took the opponent's last ring
+            score = sys.maxsize
+        else:
+            score = -evaluate(game)                             # evaluate scores for the player now to move
+        game.pop_move()
+        if best_score is None or score > best_score:
+            best_score, best_moves = score, [move]
+        elif score == best_score:
+            best_moves.append(move)
+    return generator.choice(best_moves)
+
+
+POLICIES = {'random': choose_random, 'greedy': choose_greedy}
+
+
+def play_game(task):
+    """
+    Plays one game of (game number, policy name, seed, max moves) and returns a record of it:
+    {'game': number, 'moves': ['c3-c4', ...], 'winner': game state at the end, 'length': number of moves}
+    """
+    number, policy, seed, max_moves = task
+    choose = POLICIES[policy]
+    generator = random.Random(seed)
+    game = GessGame()
+    moves = []
+    while game.get_game_state() == 'UNFINISHED' and len(moves) < max_moves:
+        legal = list(game.legal_moves())
+        if not legal:                                           # nothing left to move, the player resigns
+            game.resign_game()
+            break
+        center_from, center_to = choose(game, legal, generator)
+        game.push_move(center_from, center_to)
+        moves.append(game.convert_to_string(center_from) + '-' + game.convert_to_string(center_to))
+    return {'game': number, 'moves': moves, 'winner': game.get_game_state(), 'length': len(moves)}
+
+
+def simulate(games, workers, policy, output, seed=0, max_moves=MAX_MOVES):
+    """
+    Plays games self-play games over workers processes, writing one JSON record per line to the output file as each
+    game finishes. Returns the number of games played per second.
+    """
+    tasks = [(number, policy, seed + number, max_moves) for number in range(games)]
+    start = time.perf_counter()
+    with open(output, 'w') as records, multiprocessing.Pool(workers) as pool:
+        for record in pool.imap_unordered(play_game, tasks):
+            records.write(json.dumps(record) + '\n')
+    return games / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Play Gess games against itself and record them as JSON lines")
+    parser.add_argument('--games', type=int, default=100, help="number of games to play")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help="worker processes")
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='random', help="how each move is chosen")
+    parser.add_argument('--output', default='selfplay.jsonl', help="file the game records are written to")
+    parser.add_argument('--seed', type=int, default=0, help="game n is played with seed + n")
+    parser.add_argument('--max-moves', type=int, default=MAX_MOVES, help="moves before a game is abandoned")
+    arguments = parser.parse_args()
+    games_per_second = simulate(arguments.games, arguments.workers, arguments.policy, arguments.output,
+                                arguments.seed, arguments.max_moves)
+    print("%d games in %s: %.2f games/s" % (arguments.games, arguments.output, games_per_second))
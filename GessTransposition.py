@@ -0,0 +1,187 @@
+# Description: Transposition table for Gess positions, keyed on GessGame.get_position_hash()
+
+from multiprocessing import resource_tracker, shared_memory
+
+from GessGame import BOARD_SIZE
+
+EXACT = 0                   # stored value is the exact score of the position
+LOWER_BOUND = 1             # search failed high, the real score is at least the stored value
+UPPER_BOUND = 2             # search failed low, the real score is at most the stored value
+
+# bit widths of the fields packed into one 64-bit word by SharedTranspositionTable (8 + 22 + 2 + 18 + 12 + 1 tag bit)
+DEPTH_BITS = 8
+VALUE_BITS = 22
+VALUE_OFFSET = 1 << VALUE_BITS - 1          # values are stored offset so they are never negative
+FLAG_BITS = 2
+MOVE_BITS = 18                              # encode_move codes run up to 400 * 400
+GENERATION_BITS = 12
+
+
+class TranspositionTable:
+    """
+    Represents a fixed-size table of search results for positions already seen.
+    Each position hash maps to one slot (hash modulo size). When two positions want the same slot, the new entry
+    replaces the old one if the old one is from an earlier search or was searched no deeper than the new one.
+    """
+
+    def __init__(self, size=1 << 20):
+        """Initializes a table with size slots"""
+        self._size = size
+        self._slots = [None] * size                 # (hash, depth, value, flag, best move, generation) or None
+        self._generation = 0                        # bumped by new_search so stale entries can be replaced
+        self._used = 0                              # number of slots holding an entry
+
+    def __len__(self):
+        """Returns the number of entries stored"""
+        return self._used
+
+    def get_size(self):
+        """Returns the number of slots in the table"""
+        return self._size
+
+    def new_search(self):
+        """Marks every entry stored so far as belonging to an earlier search"""
+        self._generation += 1
+
+    def clear(self):
+        """Removes every entry"""
+        self._slots = [None] * self._size
+        self._used = 0
+
+    def probe(self, position_hash):
+        """Returns (depth, value, flag, best move) stored for the position hash, or None if it is not in the table"""
+        entry = self._slots[position_hash % self._size]
+        if entry is None or entry[0] != position_hash:
+            return None
+        return entry[1:5]
+
+    def store(self, position_hash, depth, value, flag, best_move=None):
+        """Stores a search result for the position hash, following the table's replacement policy"""
+        index = position_hash % self._size
+        entry = self._slots[index]
+        if entry is None:
+            self._used += 1
+        elif entry[0] == position_hash:
+            if best_move is None:                   # keep the move we already know about
+                best_move = entry[4]
+        elif entry[5] == self._generation and entry[1] > depth:
+            return                                  # a deeper result from this search is worth more
+        self._slots[index] = (position_hash, depth, value, flag, best_move, self._generation)
+
+
+def encode_move(move):
+    """Packs a (center_from, center_to) move into an integer (0 for no move)"""
+    if move is None:
+        return 0
+    (from_column, from_row), (to_column, to_row) = move
+    return (from_row * BOARD_SIZE + from_column) * BOARD_SIZE * BOARD_SIZE + to_row * BOARD_SIZE + to_column + 1
+
+
+def decode_move(code):
+    """Unpacks an integer made by encode_move back into a (center_from, center_to) move"""
+    if code == 0:
+        return None
+    center_from, center_to = divmod(code - 1, BOARD_SIZE * BOARD_SIZE)
+    return divmod(center_from, BOARD_SIZE)[::-1], divmod(center_to, BOARD_SIZE)[::-1]
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    Represents a transposition table kept in shared memory, so search processes can read each other's results.
+    Pickling the table (for example to pass it to a multiprocessing pool) sends only the shared memory name; the
+    unpickled copy attaches to the same slots. The process that created the table must call close() when done.
+
+    Processes write without locks. Each slot holds two 64-bit words, the packed entry and the entry XOR the position
+    hash, so an entry torn by two processes writing at once no longer matches its hash and reads as a miss.
+    """
+
+    def __init__(self, size=1 << 20):
+        """Initializes a table with size slots in a new block of shared memory"""
+        self._size = size
+        self._owner = True
+        self._memory = shared_memory.SharedMemory(create=True, size=(1 + 2 * size) * 8)
+        self._words = self._memory.buf.cast('Q')        # word 0 is the generation, then (check, data) per slot
+        self._words[0] = 0
+
+    def __getstate__(self):
+        """Pickles the table as the name and size of its shared memory"""
+        return {'name': self._memory.name, 'size': self._size}
+
+    def __setstate__(self, state):
+        """Attaches to the shared memory of a table pickled by __getstate__"""
+        self._size = state['size']
+        self._owner = False
+        self._memory = shared_memory.SharedMemory(name=state['name'])
+        # the creating process owns the block, so keep this process's resource tracker from unlinking it at exit
+        resource_tracker.unregister(self._memory._name, 'shared_memory')
+        self._words = self._memory.buf.cast('Q')
+
+    def __len__(self):
+        """Returns the number of entries stored"""
+        return sum(1 for index in range(2, 1 + 2 * self._size, 2) if self._words[index])
+
+    def new_search(self):
+        """Marks every entry stored so far as belonging to an earlier search"""
+        self._words[0] = (self._words[0] + 1) % (1 << GENERATION_BITS)
+
+    def clear(self):
+        """Removes every entry"""
+        for index in range(1, 1 + 2 * self._size):
+            self._words[index] = 0
+
+    def close(self):
+        """Detaches from the shared memory, and frees it if this process created the table"""
+        self._words.release()
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+    def probe(self, position_hash):
+        """Returns (depth, value, flag, best move) stored for the position hash, or None if it is not in the table"""
+        index = 1 + 2 * (position_hash % self._size)
+        data = self._words[index + 1]
+        if data == 0 or self._words[index] ^ data != position_hash:
+            return None
+        depth, value, flag, move_code, generation = unpack_entry(data)
+        return depth, value, flag, decode_move(move_code)
+
+    def store(self, position_hash, depth, value, flag, best_move=None):
+        """Stores a search result for the position hash, following the table's replacement policy"""
+        index = 1 + 2 * (position_hash % self._size)
+        generation = self._words[0]
+        old_data = self._words[index + 1]
+        move_code = encode_move(best_move)
+        if old_data != 0:
+            old_depth, old_value, old_flag, old_move_code, old_generation = unpack_entry(old_data)
+            if self._words[index] ^ old_data == position_hash:
+                if move_code == 0:                      # keep the move we already know about
+                    move_code = old_move_code
+            elif old_generation == generation and old_depth > depth:
+                return                                  # a deeper result from this search is worth more
+        data = pack_entry(depth, value, flag, move_code, generation)
+        self._words[index] = position_hash ^ data
+        self._words[index + 1] = data
+
+
+def pack_entry(depth, value, flag, move_code, generation):
+    """Packs a table entry into one 64-bit word (never 0, so an empty slot reads as 0)"""
+    data = min(depth, (1 << DEPTH_BITS) - 1)
+    data = data << VALUE_BITS | value + VALUE_OFFSET
+    data = data << FLAG_BITS | flag
+    data = data << MOVE_BITS | move_code
+    data = data << GENERATION_BITS | generation
+    return data << 1 | 1
+
+
+def unpack_entry(data):
+    """Unpacks a word made by pack_entry into (depth, value, flag, move code, generation)"""
+    data >>= 1
+    generation = data & (1 << GENERATION_BITS) - 1
+    data >>= GENERATION_BITS
+    move_code = data & (1 << MOVE_BITS) - 1
+    data >>= MOVE_BITS
+    flag = data & (1 << FLAG_BITS) - 1
+    data >>= FLAG_BITS
+    value = (data & (1 << VALUE_BITS) - 1) - VALUE_OFFSET
+    depth = data >> VALUE_BITS
+    return depth, value, flag, move_code, generation